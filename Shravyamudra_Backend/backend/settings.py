@@ -170,6 +170,11 @@ if not DEBUG:
 # Media files
 MEDIA_URL = os.getenv('MEDIA_URL', '/media/')
 MEDIA_ROOT = os.path.join(BASE_DIR, os.getenv('MEDIA_ROOT', 'media'))
+# How media files are sent: 'django' streams them with Range support (sendfile via the WSGI server);
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd) hand the transfer to the front proxy
+MEDIA_SERVE = os.getenv('MEDIA_SERVE', 'django')
+# nginx `internal` location aliased to MEDIA_ROOT, used with x-accel-redirect
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
 
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -178,3 +183,47 @@ EMAIL_PORT = int(os.getenv('EMAIL_PORT', '587'))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+
+# Translation
+# Sentences the rule engine glosses with at least this confidence skip the LLM backends.
+TRANSLATION_RULES_FIRST_TIER = os.getenv('TRANSLATION_RULES_FIRST_TIER', 'True') == 'True'
+TRANSLATION_RULES_MIN_CONFIDENCE = float(os.getenv('TRANSLATION_RULES_MIN_CONFIDENCE', '0.8'))
+# Fuzzy translation memory of past LLM glosses (per process)
+TRANSLATION_MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY_ENABLED', 'True') == 'True'
+TRANSLATION_MEMORY_SIZE = int(os.getenv('TRANSLATION_MEMORY_SIZE', '10000'))
+TRANSLATION_MEMORY_MIN_SIMILARITY = float(os.getenv('TRANSLATION_MEMORY_MIN_SIMILARITY', '0.75'))
+# Upper bound on one translation request; clients may ask for less via options.deadline_ms
+TRANSLATION_MAX_DEADLINE_SECONDS = float(os.getenv('TRANSLATION_MAX_DEADLINE_SECONDS', '60'))
+# Hedging (opt-in per request with options.hedge): Gemini is tried once Ollama is slower than this percentile
+TRANSLATION_HEDGING_ENABLED = os.getenv('TRANSLATION_HEDGING_ENABLED', 'True') == 'True'
+TRANSLATION_HEDGE_PERCENTILE = float(os.getenv('TRANSLATION_HEDGE_PERCENTILE', '95'))
+TRANSLATION_HEDGE_FALLBACK_DELAY_SECONDS = float(os.getenv('TRANSLATION_HEDGE_FALLBACK_DELAY_SECONDS', '2.0'))
+# Worker threads shared by hedged calls; once all are busy the primary runs inline without a hedge
+TRANSLATION_HEDGE_MAX_WORKERS = int(os.getenv('TRANSLATION_HEDGE_MAX_WORKERS', '16'))
+# Fair admission to the local LLM: global concurrency, queue bound, and a per-user token
+# bucket (one token per sentence sent to the LLM) for interactive requests
+TRANSLATION_LLM_MAX_CONCURRENCY = int(os.getenv('TRANSLATION_LLM_MAX_CONCURRENCY', '2'))
+TRANSLATION_LLM_MAX_QUEUE = int(os.getenv('TRANSLATION_LLM_MAX_QUEUE', '50'))
+TRANSLATION_LLM_MAX_WAIT_SECONDS = float(os.getenv('TRANSLATION_LLM_MAX_WAIT_SECONDS', '10'))
+TRANSLATION_USER_RATE = float(os.getenv('TRANSLATION_USER_RATE', '0.5'))  # tokens per second
+TRANSLATION_USER_BURST = float(os.getenv('TRANSLATION_USER_BURST', '20'))
+# Background document translation jobs (/api/translation/jobs/)
+TRANSLATION_JOB_WORKERS = int(os.getenv('TRANSLATION_JOB_WORKERS', '2'))
+TRANSLATION_JOB_CHUNK_SIZE = int(os.getenv('TRANSLATION_JOB_CHUNK_SIZE', '5'))
+# Translation history, written in batches by a background thread
+TRANSLATION_HISTORY_ENABLED = os.getenv('TRANSLATION_HISTORY_ENABLED', 'True') == 'True'
+TRANSLATION_HISTORY_BATCH_SIZE = int(os.getenv('TRANSLATION_HISTORY_BATCH_SIZE', '50'))
+TRANSLATION_HISTORY_FLUSH_MS = int(os.getenv('TRANSLATION_HISTORY_FLUSH_MS', '500'))
+TRANSLATION_HISTORY_MAX_PENDING = int(os.getenv('TRANSLATION_HISTORY_MAX_PENDING', '5000'))
+
+# Ollama model warm-up (keep_alive itself is read from OLLAMA_KEEP_ALIVE in translation/ollama_api.py)
+OLLAMA_PREWARM_ON_STARTUP = os.getenv('OLLAMA_PREWARM_ON_STARTUP', 'False') == 'True'
+OLLAMA_PREWARM_MODELS = [m for m in os.getenv('OLLAMA_PREWARM_MODELS', 'mistral').split(',') if m]
+OLLAMA_KEEP_WARM_INTERVAL = int(os.getenv('OLLAMA_KEEP_WARM_INTERVAL', '0'))  # seconds, 0 disables
+OLLAMA_KEEP_WARM_HOURS = tuple(int(h) for h in os.getenv('OLLAMA_KEEP_WARM_HOURS', '9-18').split('-'))
+
+# Learning
+# Video views are counted in memory and written in batched UPDATEs this often; 0 writes each view immediately
+LEARN_VIEW_COUNT_FLUSH_SECONDS = float(os.getenv('LEARN_VIEW_COUNT_FLUSH_SECONDS', '10'))
+# Progress pings without a rating keep only the latest state per user and video and are written this often; 0 writes each ping
+LEARN_HEARTBEAT_FLUSH_SECONDS = float(os.getenv('LEARN_HEARTBEAT_FLUSH_SECONDS', '5'))
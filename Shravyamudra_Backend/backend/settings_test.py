@@ -6,3 +6,9 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+
+# The history writer thread would insert outside the test transaction; history tests flush by hand
+TRANSLATION_HISTORY_ENABLED = False
+# Count video views synchronously so tests see them without a flush thread
+LEARN_VIEW_COUNT_FLUSH_SECONDS = 0
+LEARN_HEARTBEAT_FLUSH_SECONDS = 0
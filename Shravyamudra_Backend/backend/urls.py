@@ -36,7 +36,12 @@ urlpatterns = [
     path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
 ]
 
-# Serve gesture video files in development
+# Serve media files (gesture and learn videos) with Range support, also outside DEBUG
+import re
 from django.conf import settings
-from django.conf.urls.static import static
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+from django.urls import re_path
+from common.views import serve_media
+if not re.match(r'^\w+://', settings.MEDIA_URL):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+    ]
@@ -1,3 +1,71 @@
-from django.test import TestCase
+import os
+import tempfile
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from .views import parse_range
+
+class ParseRangeTest(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=990-2000', 1000), (990, 999))
+        # Malformed, reversed and multiple ranges fall back to the whole file
+        for header in ('bytes=5-1', 'items=0-1', 'bytes=0-1,5-6', 'bytes=-'):
+            self.assertIsNone(parse_range(header, 1000))
+        for header in ('bytes=1000-', 'bytes=-0'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 1000)
+
+class ServeMediaTest(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        os.makedirs(os.path.join(self.media_root.name, 'learn', 'videos'))
+        self.content = bytes(range(256)) * 4
+        with open(os.path.join(self.media_root.name, 'learn', 'videos', 'a.mp4'), 'wb') as f:
+            f.write(self.content)
+        settings = override_settings(MEDIA_ROOT=self.media_root.name, MEDIA_SERVE='django')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, **headers):
+        return self.client.get('/media/learn/videos/a.mp4', headers=headers)
+
+    def test_full_and_partial_responses(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual((response['Accept-Ranges'], response['Content-Type']), ('bytes', 'video/mp4'))
+
+        response = self.get(Range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/1024')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+        response = self.get(Range='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_validators(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(If_None_Match=etag).status_code, 304)
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=etag).status_code, 206)
+        # A stale If-Range validator gets the whole, current file
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range='"stale"').status_code, 200)
+
+    def test_missing_and_traversal(self):
+        self.assertEqual(self.client.get('/media/learn/videos/missing.mp4').status_code, 404)
+        self.assertEqual(self.client.get('/media/learn/videos/').status_code, 404)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+    def test_proxy_offload(self):
+        with override_settings(MEDIA_SERVE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/'):
+            response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/learn/videos/a.mp4')
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_SERVE='x-sendfile'):
+            response = self.get()
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root.name, 'learn', 'videos', 'a.mp4'))
@@ -1,3 +1,133 @@
-from django.shortcuts import render
+import mimetypes
+import os
+import re
+import stat
+from typing import Optional, Tuple
+from urllib.parse import quote
 
-# Create your views here.
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# --- Media files ---
+# Serves MEDIA_ROOT with byte-range support so the learn player can seek and
+# resume without downloading the video again from the start. With
+# MEDIA_SERVE='django' the file is streamed by FileResponse, which WSGI servers
+# such as gunicorn hand to os.sendfile(). A partial response keeps the file
+# descriptor, so the requested window can be sent the same way. Behind nginx or
+# Apache, 'x-accel-redirect' / 'x-sendfile' leave the transfer (and Range
+# handling) to the proxy.
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+class RangeFile:
+    """
+    Reads at most `length` bytes of `file` from `start`. Exposes fileno() so a
+    server's sendfile path can still send the window from the current offset.
+    """
+    def __init__(self, file, start: int, length: int):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def close(self) -> None:
+        self.file.close()
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range `Range` header into an inclusive (start, end).
+    Returns None when the whole file should be sent (malformed or multiple
+    ranges are ignored) and raises ValueError when the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(int(last), size - 1) if last else size - 1
+
+def _if_range_matches(request, etag: str, last_modified: int) -> bool:
+    """A Range is honoured only while the client's copy (If-Range) is still current."""
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        # Strong comparison only
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+def _file_response(request, full_path: str, size: int, content_type: str, etag: str, last_modified: int):
+    byte_range = None
+    if 'Range' in request.headers and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(file, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        info = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('File not found')
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404('File not found')
+
+    etag = f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+    last_modified = int(info.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    if settings.MEDIA_SERVE == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(path)
+    elif settings.MEDIA_SERVE == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = _file_response(request, full_path, info.st_size, content_type, etag, last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(info.st_mtime)
+    return response
@@ -4,7 +4,8 @@ from .models import Category, LearnVideo, WatchedVideo, LearningProgress, UserLe
 # Register models with admin site
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'order', 'icon')
+    list_display = ('name', 'order', 'icon', 'video_count')
+    readonly_fields = ('video_count',)
     search_fields = ('name',)
     ordering = ('order', 'name')
     list_per_page = 20
@@ -0,0 +1,86 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from .models import LearnVideo
+
+# --- Buffered view counters ---
+# Video detail GETs only bump an in-memory counter. A background thread turns
+# the accumulated counts into atomic `views = views + n` UPDATEs every
+# `flush_interval` seconds, one statement per distinct n, so reads never write
+# the row (or bump updated_at) and concurrent views are never lost. Counts
+# still pending when the process is killed without running atexit are lost.
+
+class ViewCounterBuffer:
+    def __init__(self, flush_interval: float = 10, autostart: bool = True):
+        self.flush_interval = flush_interval
+        self.autostart = autostart
+        self._pending = defaultdict(int)  # video id -> views not yet written
+        self._lock = threading.Lock()
+        self._thread = None
+        self._counts = {'flushed_views': 0, 'flushes': 0, 'failed_flushes': 0}
+
+    def increment(self, video_id: int, n: int = 1) -> None:
+        if self.flush_interval <= 0:
+            LearnVideo.objects.filter(id=video_id).update(views=F('views') + n)
+            return
+        with self._lock:
+            self._pending[video_id] += n
+            if self.autostart and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='learn-view-counter', daemon=True)
+                self._thread.start()
+
+    def pending(self, video_id: int) -> int:
+        with self._lock:
+            return self._pending.get(video_id, 0)
+
+    def flush(self) -> int:
+        """Writes all pending counts. Returns the number of views written."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        if not pending:
+            return 0
+        by_increment = defaultdict(list)
+        for video_id, n in pending.items():
+            by_increment[n].append(video_id)
+        try:
+            with transaction.atomic():
+                for n, video_ids in by_increment.items():
+                    LearnVideo.objects.filter(id__in=video_ids).update(views=F('views') + n)
+        except Exception:
+            logging.exception("Could not write %d buffered video views", sum(pending.values()))
+            with self._lock:
+                # Keep the counts for the next flush
+                for video_id, n in pending.items():
+                    self._pending[video_id] += n
+                self._counts['failed_flushes'] += 1
+            return 0
+        with self._lock:
+            self._counts['flushed_views'] += sum(pending.values())
+            self._counts['flushes'] += 1
+        return sum(pending.values())
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            self.flush()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'pending_videos': len(self._pending),
+                'pending_views': sum(self._pending.values()),
+                'flush_interval_seconds': self.flush_interval,
+                **self._counts,
+            }
+
+VIEW_COUNTER = ViewCounterBuffer(flush_interval=settings.LEARN_VIEW_COUNT_FLUSH_SECONDS)
+atexit.register(VIEW_COUNTER.flush)
@@ -0,0 +1,162 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import LearnVideo, WatchedVideo
+from .progress import upsert_watched
+
+# --- Coalesced progress heartbeats ---
+# Progress pings from a playing video only replace the latest state kept in
+# memory for that (user, video). A background thread writes what has
+# accumulated every `flush_interval` seconds, one upsert per user, so a viewer
+# sending a ping every few seconds costs one write per interval. A change of
+# is_completed (either way) flushes that user's state at once, and reads of the
+# user's own progress flush it first. State is per process: pending pings are lost if the process
+# is killed without running atexit.
+#
+# Flushes of the same user are serialized by a striped lock held from taking
+# the pending state until it is written, so an overlapping flush cannot commit
+# an older snapshot after a newer one.
+
+FLUSH_STRIPES = 64
+
+class HeartbeatBuffer:
+    def __init__(self, flush_interval: float = 5, autostart: bool = True, max_known: int = 10000):
+        self.flush_interval = flush_interval
+        self.autostart = autostart
+        self.max_known = max_known
+        self._pending = {}  # (user id, video id) -> (user, {progress, is_completed})
+        self._known = OrderedDict()  # (user id, video id) -> last written is_completed, least recent first
+        self._lock = threading.Lock()
+        self._flush_locks = [threading.Lock() for _ in range(FLUSH_STRIPES)]
+        self._thread = None
+        self._counts = {'heartbeats': 0, 'written': 0, 'flushes': 0, 'failed_flushes': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval > 0
+
+    def _remember(self, key, is_completed: bool) -> None:
+        # Caller holds the lock
+        self._known[key] = is_completed
+        self._known.move_to_end(key)
+        while len(self._known) > self.max_known:
+            self._known.popitem(last=False)
+
+    def _last_completed(self, user, video_id: int) -> bool:
+        """is_completed as last pinged or written; read from the database once per key otherwise."""
+        key = (user.pk, video_id)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key][1]['is_completed']
+            if key in self._known:
+                return self._known[key]
+        completed = bool(WatchedVideo.objects.filter(user=user, video_id=video_id).values_list('is_completed', flat=True).first())
+        with self._lock:
+            self._remember(key, completed)
+        return completed
+
+    def record(self, user, video_id: int, progress: int, is_completed: bool) -> None:
+        changed = self._last_completed(user, video_id) != is_completed
+        with self._lock:
+            self._pending[(user.pk, video_id)] = (user, {'progress': progress, 'is_completed': is_completed})
+            self._counts['heartbeats'] += 1
+            if self.autostart and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='learn-heartbeats', daemon=True)
+                self._thread.start()
+        if changed:
+            self.flush(user_id=user.pk)
+
+    def discard(self, user_id: int, video_id: int) -> None:
+        """Drops pending and remembered state that a direct write or delete has superseded."""
+        with self._lock:
+            self._pending.pop((user_id, video_id), None)
+            self._known.pop((user_id, video_id), None)
+
+    def pending(self, user_id: int, video_id: int) -> Optional[dict]:
+        with self._lock:
+            item = self._pending.get((user_id, video_id))
+            return dict(item[1]) if item else None
+
+    def _stripe(self, user_id) -> int:
+        return hash(user_id) % len(self._flush_locks)
+
+    def flush(self, user_id: Optional[int] = None) -> int:
+        """Writes pending state, for one user or everyone. Returns the number of rows written."""
+        if user_id is None:
+            with self._lock:
+                stripes = sorted({self._stripe(key[0]) for key in self._pending})
+        else:
+            stripes = [self._stripe(user_id)]
+
+        written = 0
+        flushed = False
+        for stripe in stripes:
+            with self._flush_locks[stripe]:
+                with self._lock:
+                    keys = [key for key in self._pending
+                            if key[0] == user_id or (user_id is None and self._stripe(key[0]) == stripe)]
+                    taken = {key: self._pending.pop(key) for key in keys}
+                if taken:
+                    written += self._write(taken)
+                    flushed = True
+        if not flushed:
+            return 0
+        with self._lock:
+            self._counts['written'] += written
+            self._counts['flushes'] += 1
+        return written
+
+    def _write(self, taken) -> int:
+        # Caller holds the flush lock of every user in `taken`
+        by_user = defaultdict(dict)
+        users = {}
+        for (pk, video_id), (user, entry) in taken.items():
+            users[pk] = user
+            by_user[pk][video_id] = entry
+        # Videos deleted since the ping are skipped
+        videos = LearnVideo.objects.only('id', 'category_id', 'duration').in_bulk({key[1] for key in taken})
+
+        written = 0
+        for pk, entries in by_user.items():
+            entries = {video_id: entry for video_id, entry in entries.items() if video_id in videos}
+            if not entries:
+                continue
+            try:
+                upsert_watched(users[pk], videos, entries)
+            except Exception:
+                logging.exception("Could not write %d buffered heartbeats for user %s", len(entries), pk)
+                with self._lock:
+                    # Keep the state for the next flush unless a newer ping replaced it
+                    for video_id, entry in entries.items():
+                        self._pending.setdefault((pk, video_id), (users[pk], entry))
+                    self._counts['failed_flushes'] += 1
+                continue
+            written += len(entries)
+            with self._lock:
+                for video_id, entry in entries.items():
+                    self._remember((pk, video_id), entry['is_completed'])
+        return written
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            self.flush()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'flush_interval_seconds': self.flush_interval,
+                **self._counts,
+            }
+
+HEARTBEATS = HeartbeatBuffer(flush_interval=settings.LEARN_HEARTBEAT_FLUSH_SECONDS)
+atexit.register(HEARTBEATS.flush)
@@ -0,0 +1,47 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from learning.models import LearningProgress, UserLearningStats, WatchedVideo
+from learning.progress import rebuild_learning_stats, recount_category_videos
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Recompute category video counts, LearningProgress and UserLearningStats with grouped SQL aggregates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', nargs='+', help='Only rebuild these users (ids or usernames)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Users per transaction')
+
+    def _user_ids(self, selectors):
+        if selectors:
+            ids = {int(s) for s in selectors if s.isdigit()}
+            names = [s for s in selectors if not s.isdigit()]
+            ids |= set(User.objects.filter(username__in=names).values_list('id', flat=True))
+            if not ids:
+                raise CommandError('No matching users')
+            return sorted(ids)
+        # Everyone with watch history or totals that may need zeroing
+        ids = set(WatchedVideo.objects.values_list('user_id', flat=True).distinct())
+        ids |= set(LearningProgress.objects.values_list('user_id', flat=True).distinct())
+        ids |= set(UserLearningStats.objects.values_list('user_id', flat=True))
+        return sorted(ids)
+
+    def handle(self, *args, **options):
+        user_ids = self._user_ids(options['user'])
+        chunk_size = max(1, options['chunk_size'])
+        start = time.time()
+        categories = recount_category_videos()
+        self.stdout.write(f'Recounted videos in {categories} categories')
+        written = {'progress': 0, 'stats': 0}
+        for offset in range(0, len(user_ids), chunk_size):
+            result = rebuild_learning_stats(user_ids[offset:offset + chunk_size])
+            for key in written:
+                written[key] += result[key]
+            done = min(offset + chunk_size, len(user_ids))
+            self.stdout.write(f'{done}/{len(user_ids)} users ({time.time() - start:.1f}s)')
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written['progress']} progress rows and {written['stats']} stats rows "
+            f"for {len(user_ids)} users in {time.time() - start:.1f}s"
+        ))
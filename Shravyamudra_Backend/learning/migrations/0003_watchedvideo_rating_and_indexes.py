@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-19 11:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0002_alter_category_options_alter_learnvideo_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watchedvideo',
+            name='rating',
+            field=models.PositiveSmallIntegerField(blank=True, help_text="User's rating (1-5)", null=True),
+        ),
+        migrations.AddIndex(
+            model_name='learnvideo',
+            index=models.Index(fields=['category', 'level', 'is_featured', '-created_at'], name='learnvideo_filter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='learnvideo',
+            index=models.Index(fields=['-created_at', 'id'], name='learnvideo_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='learnvideo',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['-created_at'], name='learnvideo_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchedvideo',
+            index=models.Index(fields=['user', '-last_watched_at'], name='watched_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchedvideo',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['user'], name='watched_user_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchedvideo',
+            index=models.Index(condition=models.Q(('rating__isnull', False)), fields=['video', 'rating'], name='watched_video_rating_idx'),
+        ),
+    ]
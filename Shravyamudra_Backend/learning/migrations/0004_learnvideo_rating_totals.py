@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-19 11:40
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    LearnVideo = apps.get_model('learning', 'LearnVideo')
+    WatchedVideo = apps.get_model('learning', 'WatchedVideo')
+    totals = WatchedVideo.objects.filter(rating__isnull=False).values('video').annotate(
+        total=Sum('rating'), count=Count('id')
+    )
+    for row in totals:
+        LearnVideo.objects.filter(pk=row['video']).update(rating_sum=row['total'], rating_count=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0003_watchedvideo_rating_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='learnvideo',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of user ratings'),
+        ),
+        migrations.AddField(
+            model_name='learnvideo',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, help_text='Sum of all user ratings'),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='learnvideo',
+            name='average_rating',
+        ),
+    ]
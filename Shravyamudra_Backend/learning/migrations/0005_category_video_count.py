@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 11:47
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_video_counts(apps, schema_editor):
+    Category = apps.get_model('learning', 'Category')
+    LearnVideo = apps.get_model('learning', 'LearnVideo')
+    for row in LearnVideo.objects.values('category').annotate(count=Count('id')).order_by():
+        Category.objects.filter(pk=row['category']).update(video_count=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_learnvideo_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_video_counts, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='learningprogress',
+            name='total_videos',
+        ),
+    ]
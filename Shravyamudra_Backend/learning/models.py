@@ -1,12 +1,33 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
 from datetime import timedelta
+from decimal import Decimal
+
+class CategoryQuerySet(models.QuerySet):
+    def with_stats(self, user):
+        """
+        Annotates the user's LearningProgress columns (progress_completed,
+        progress_time_spent; None without a progress row) so CategorySerializer
+        needs no per-category queries.
+        """
+        if not user or not user.is_authenticated:
+            return self
+        progress = LearningProgress.objects.filter(user=user, category=OuterRef('pk'))
+        return self.annotate(
+            progress_completed=Subquery(progress.values('completed_videos')[:1]),
+            progress_time_spent=Subquery(progress.values('total_time_spent')[:1]),
+        )
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     icon = models.CharField(max_length=50, blank=True, help_text="Icon name from Lucide icons")
     order = models.PositiveIntegerField(default=0, help_text="Order in which categories should appear")
+    # Kept in step with LearnVideo saves and deletes by learning.signals
+    video_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CategoryQuerySet.as_manager()
 
     class Meta:
         ordering = ['order', 'name']
@@ -32,27 +53,51 @@ class LearnVideo(models.Model):
     is_featured = models.BooleanField(default=False)
     views = models.PositiveIntegerField(default=0, help_text="Total number of views")
     likes = models.PositiveIntegerField(default=0, help_text="Total number of likes")
-    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0, help_text="Average rating (0-5)")
+    rating_sum = models.PositiveIntegerField(default=0, help_text="Sum of all user ratings")
+    rating_count = models.PositiveIntegerField(default=0, help_text="Number of user ratings")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Video list filters (category, level, featured) sorted newest first
+            models.Index(fields=['category', 'level', 'is_featured', '-created_at'], name='learnvideo_filter_idx'),
+            # Unfiltered keyset pages on (-created_at, id)
+            models.Index(fields=['-created_at', 'id'], name='learnvideo_created_idx'),
+            models.Index(fields=['-created_at'], condition=Q(is_featured=True), name='learnvideo_featured_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def average_rating(self):
+        """Average rating (0-5), derived from the running sum and count."""
+        if not self.rating_count:
+            return Decimal('0.00')
+        return (Decimal(self.rating_sum) / self.rating_count).quantize(Decimal('0.01'))
+
 class WatchedVideo(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='watched_videos')
     video = models.ForeignKey(LearnVideo, on_delete=models.CASCADE, related_name='watched_by')
     progress = models.PositiveIntegerField(default=0, help_text="Progress percentage (0-100)")
     is_completed = models.BooleanField(default=False)
+    rating = models.PositiveSmallIntegerField(blank=True, null=True, help_text="User's rating (1-5)")
     last_watched_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('user', 'video')
         ordering = ['-last_watched_at']
+        indexes = [
+            # Watch history and recent activity, newest first
+            models.Index(fields=['user', '-last_watched_at'], name='watched_user_recent_idx'),
+            # Completed-video counts per user
+            models.Index(fields=['user'], condition=Q(is_completed=True), name='watched_user_completed_idx'),
+            # Average rating per video
+            models.Index(fields=['video', 'rating'], condition=Q(rating__isnull=False), name='watched_video_rating_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} watched {self.video.title}"
@@ -60,7 +105,6 @@ class WatchedVideo(models.Model):
 class LearningProgress(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='learning_progress')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='progress')
-    total_videos = models.PositiveIntegerField(default=0)
     completed_videos = models.PositiveIntegerField(default=0)
     total_time_spent = models.DurationField(default=timedelta(), help_text="Total time spent watching videos in this category")
     last_activity = models.DateTimeField(auto_now=True)
@@ -70,6 +114,10 @@ class LearningProgress(models.Model):
         unique_together = ('user', 'category')
         verbose_name_plural = "Learning Progress"
 
+    @property
+    def total_videos(self) -> int:
+        return self.category.video_count
+
     def __str__(self):
         return f"{self.user.username}'s progress in {self.category.name}"
 
@@ -84,3 +132,6 @@ class UserLearningStats(models.Model):
 
     def __str__(self):
         return f"{self.user.username}'s learning stats"
+
+# Keep Category.video_count in step with LearnVideo
+import learning.signals
@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination on `ordering` = (sort field, unique tie-breaker).
+    The cursor holds the last row's values and the next page is fetched with
+    WHERE (sort, id) is past the cursor, so there is no OFFSET scan and rows
+    inserted meanwhile never shift or repeat items across pages.
+    Staff may pass ?limit=&offset= instead (admin tables that jump to a page).
+    """
+    ordering = ('-created_at', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _encode_cursor(self, values):
+        payload = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def _decode_cursor(self, cursor):
+        try:
+            sort_value, tie_value = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            parsed = parse_datetime(sort_value) if isinstance(sort_value, str) else sort_value
+            return (sort_value if parsed is None else parsed), tie_value
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+
+    def _after(self, sort_value, tie_value):
+        """Rows strictly after the cursor in `ordering`."""
+        (sort_field, tie_field) = self.ordering
+        sort_name, tie_name = sort_field.lstrip('-'), tie_field.lstrip('-')
+        sort_op = 'lt' if sort_field.startswith('-') else 'gt'
+        tie_op = 'lt' if tie_field.startswith('-') else 'gt'
+        return Q(**{f'{sort_name}__{sort_op}': sort_value}) | Q(
+            **{sort_name: sort_value, f'{tie_name}__{tie_op}': tie_value}
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if 'offset' in request.query_params and request.user.is_staff:
+            self.fallback = LimitOffsetPagination()
+            self.fallback.default_limit, self.fallback.max_limit = self.page_size, self.max_page_size
+            return self.fallback.paginate_queryset(queryset.order_by(*self.ordering), request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(*self._decode_cursor(cursor)))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        page = rows[:page_size]
+        if self.has_next:
+            last = page[-1]
+            self.next_cursor = self._encode_cursor(
+                [getattr(last, field.lstrip('-')) for field in self.ordering]
+            )
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+class LearnVideoPagination(KeysetPagination):
+    ordering = ('-created_at', 'id')
+
+class WatchedVideoPagination(KeysetPagination):
+    ordering = ('-last_watched_at', 'id')
@@ -0,0 +1,213 @@
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, F, Func, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Category, LearnVideo, LearningProgress, UserLearningStats, WatchedVideo
+
+# --- Incremental progress maintenance ---
+# LearningProgress and UserLearningStats are adjusted by the difference between
+# a WatchedVideo's old and new (progress, is_completed) state, with F()
+# updates, so a progress ping costs the same for a new user and a heavy one.
+# Rows that do not exist yet are built once from the full history.
+
+WatchState = Optional[Tuple[int, bool]]  # (progress, is_completed); None when there is no WatchedVideo row
+
+def watch_state(watched: Optional[WatchedVideo]) -> WatchState:
+    return (watched.progress, watched.is_completed) if watched else None
+
+def _deltas(video: LearnVideo, old: WatchState, new: WatchState):
+    old_progress, old_completed = old or (0, False)
+    new_progress, new_completed = new or (0, False)
+    completed = int(new_completed) - int(old_completed)
+    duration = video.duration or timedelta()
+    watched_time = duration * (new_progress / 100) - duration * (old_progress / 100)
+    return completed, watched_time, duration * completed
+
+def _recompute_progress(user, category) -> dict:
+    """Full rebuild of one LearningProgress row; only used when the row is first created."""
+    completed_videos = WatchedVideo.objects.filter(user=user, video__category=category, is_completed=True).count()
+    total_time = timedelta()
+    for watched in WatchedVideo.objects.filter(user=user, video__category=category).select_related('video'):
+        if watched.video.duration:
+            total_time += watched.video.duration * (watched.progress / 100)
+    return {'completed_videos': completed_videos, 'total_time_spent': total_time}
+
+def _recompute_stats(user) -> dict:
+    """Full rebuild of UserLearningStats totals; only used when the row is first created."""
+    total_time = timedelta()
+    for watched in WatchedVideo.objects.filter(user=user, is_completed=True).select_related('video'):
+        if watched.video.duration:
+            total_time += watched.video.duration
+    return {
+        'total_videos_watched': WatchedVideo.objects.filter(user=user, is_completed=True).count(),
+        'total_time_spent': total_time,
+    }
+
+def apply_watch_change(user, video: LearnVideo, old: WatchState, new: WatchState, update_streak: bool = True) -> None:
+    """
+    Applies one WatchedVideo change (old -> new state) to the user's category
+    progress and overall stats. Call after the WatchedVideo row has been written,
+    inside the same transaction.
+    """
+    apply_watch_changes(user, [(video, old, new)], update_streak=update_streak)
+
+def apply_watch_changes(user, changes: List[Tuple[LearnVideo, WatchState, WatchState]], update_streak: bool = True) -> None:
+    """
+    Applies several WatchedVideo changes at once: one progress UPDATE per
+    affected category and one stats UPDATE, however many videos changed.
+    """
+    now = timezone.now()
+    by_category = defaultdict(lambda: [0, timedelta()])  # category id -> [completed delta, watch time delta]
+    completed_total, completed_time_total = 0, timedelta()
+    for video, old, new in changes:
+        completed, watched_time, completed_time = _deltas(video, old, new)
+        by_category[video.category_id][0] += completed
+        by_category[video.category_id][1] += watched_time
+        completed_total += completed
+        completed_time_total += completed_time
+
+    with transaction.atomic():
+        for category_id, (completed, watched_time) in by_category.items():
+            updated = LearningProgress.objects.filter(user=user, category_id=category_id).update(
+                completed_videos=F('completed_videos') + completed,
+                total_time_spent=F('total_time_spent') + watched_time,
+                last_activity=now,
+            )
+            if not updated:
+                LearningProgress.objects.create(
+                    user=user, category_id=category_id, **_recompute_progress(user, category_id)
+                )
+
+        stats = UserLearningStats.objects.select_for_update().filter(user=user).first()
+        if stats is None:
+            UserLearningStats.objects.create(user=user, **_recompute_stats(user))
+            return
+
+        fields = {
+            'total_videos_watched': F('total_videos_watched') + completed_total,
+            'total_time_spent': F('total_time_spent') + completed_time_total,
+            'last_activity': now,
+        }
+        if update_streak:
+            today = now.date()
+            yesterday = today - timedelta(days=1)
+            last_day = stats.last_activity.date()
+            if last_day == yesterday:
+                fields['current_streak'] = stats.current_streak + 1
+                fields['longest_streak'] = max(stats.longest_streak, stats.current_streak + 1)
+            elif last_day < yesterday:
+                fields['current_streak'] = 1
+        UserLearningStats.objects.filter(pk=stats.pk).update(**fields)
+
+def apply_rating_change(video: LearnVideo, old_rating: Optional[int], new_rating: Optional[int]) -> None:
+    """Adjusts the video's running rating sum and count for one rating added, changed or removed."""
+    if old_rating == new_rating:
+        return
+    LearnVideo.objects.filter(pk=video.pk).update(
+        rating_sum=F('rating_sum') + (new_rating or 0) - (old_rating or 0),
+        rating_count=F('rating_count') + (new_rating is not None) - (old_rating is not None),
+    )
+
+def upsert_watched(user, videos: Dict[int, LearnVideo], entries: Dict[int, dict]) -> int:
+    """
+    Writes the latest state for several of the user's videos with a single
+    upsert and applies the changes to ratings, progress and stats.
+    `entries` maps video id -> {progress, is_completed[, rating]}; `videos` must
+    hold those ids with category_id and duration loaded. An entry without a
+    rating keeps the earlier one. Returns the number of rows created.
+    """
+    with transaction.atomic():
+        previous = {
+            w.video_id: w for w in
+            WatchedVideo.objects.select_for_update().filter(user=user, video_id__in=entries)
+        }
+        rows = []
+        for video_id, entry in entries.items():
+            old = previous.get(video_id)
+            rating = entry['rating'] if entry.get('rating') is not None else (old.rating if old else None)
+            rows.append(WatchedVideo(
+                user=user, video_id=video_id, progress=entry['progress'],
+                is_completed=entry['is_completed'], rating=rating,
+            ))
+        WatchedVideo.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['user', 'video'],
+            update_fields=['progress', 'is_completed', 'rating', 'last_watched_at'],
+        )
+
+        for row in rows:
+            old = previous.get(row.video_id)
+            apply_rating_change(videos[row.video_id], old.rating if old else None, row.rating)
+        apply_watch_changes(user, [
+            (videos[row.video_id], watch_state(previous.get(row.video_id)), watch_state(row)) for row in rows
+        ])
+    return len(rows) - len(previous)
+
+# --- Set-based rebuild ---
+# Recomputes LearningProgress and UserLearningStats totals for a set of users
+# with grouped aggregates, without loading WatchedVideo instances. Used by
+# `manage.py rebuild_learning_stats` to repair or backfill the incremental
+# totals above. Streaks depend on day-by-day history and are left as they are.
+
+class DurationMicroseconds(Func):
+    """A DurationField as integer microseconds, so it can be scaled and summed in SQL."""
+    template = '%(expressions)s'  # SQLite and MySQL already store durations as microseconds
+    output_field = BigIntegerField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template='(EXTRACT(EPOCH FROM %(expressions)s) * 1000000)::bigint', **extra_context
+        )
+
+def rebuild_learning_stats(user_ids: List[int]) -> Dict[str, int]:
+    """Rebuilds both tables for `user_ids` in one transaction. Returns the number of rows written."""
+    duration = DurationMicroseconds('video__duration')
+    progress_rows = (
+        WatchedVideo.objects.filter(user_id__in=user_ids)
+        .values('user_id', 'video__category_id')
+        .annotate(
+            completed=Count('id', filter=Q(is_completed=True)),
+            micros=Coalesce(Sum(duration * F('progress') / 100), 0),
+        )
+        .order_by()
+    )
+    stats_rows = {
+        row['user_id']: row
+        for row in WatchedVideo.objects.filter(user_id__in=user_ids, is_completed=True)
+        .values('user_id')
+        .annotate(completed=Count('id'), micros=Coalesce(Sum(duration), 0))
+        .order_by()
+    }
+    with transaction.atomic():
+        # Rows with no watched videos left are zeroed; the rest are overwritten below
+        LearningProgress.objects.filter(user_id__in=user_ids).update(completed_videos=0, total_time_spent=timedelta())
+        progress = LearningProgress.objects.bulk_create([
+            LearningProgress(
+                user_id=row['user_id'],
+                category_id=row['video__category_id'],
+                completed_videos=row['completed'],
+                total_time_spent=timedelta(microseconds=row['micros']),
+            )
+            for row in progress_rows
+        ], update_conflicts=True, unique_fields=['user', 'category'],
+            update_fields=['completed_videos', 'total_time_spent'])
+        stats = UserLearningStats.objects.bulk_create([
+            UserLearningStats(
+                user_id=user_id,
+                total_videos_watched=stats_rows.get(user_id, {}).get('completed', 0),
+                total_time_spent=timedelta(microseconds=stats_rows.get(user_id, {}).get('micros', 0)),
+            )
+            for user_id in user_ids
+        ], update_conflicts=True, unique_fields=['user'], update_fields=['total_videos_watched', 'total_time_spent'])
+    return {'progress': len(progress), 'stats': len(stats)}
+
+def recount_category_videos() -> int:
+    """Resets every Category.video_count from LearnVideo, for drift left by bulk writes. Returns rows updated."""
+    return Category.objects.update(video_count=Coalesce(Subquery(
+        LearnVideo.objects.filter(category=OuterRef('pk')).values('category')
+        .annotate(count=Count('id')).values('count')
+    ), 0))
@@ -2,31 +2,44 @@ from rest_framework import serializers
 from .models import Category, LearnVideo, WatchedVideo, LearningProgress, UserLearningStats
 from django.utils import timezone
 
+def watched_map(user, videos):
+    """Loads the user's WatchedVideo rows for `videos` in one query, keyed by video id."""
+    if not user or not user.is_authenticated:
+        return {}
+    return {w.video_id: w for w in WatchedVideo.objects.filter(user=user, video__in=[v.id for v in videos])}
+
+EMPTY_PROGRESS = {'total': 0, 'completed': 0, 'percentage': 0, 'time_spent': '0:00:00'}
+
 class CategorySerializer(serializers.ModelSerializer):
-    video_count = serializers.SerializerMethodField()
+    video_count = serializers.IntegerField(read_only=True)
     progress = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'icon', 'order', 'video_count', 'progress']
 
-    def get_video_count(self, obj):
-        return obj.videos.count()
-
     def get_progress(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            try:
-                progress = LearningProgress.objects.get(user=request.user, category=obj)
-                return {
-                    'total': progress.total_videos,
-                    'completed': progress.completed_videos,
-                    'percentage': int((progress.completed_videos / progress.total_videos * 100) if progress.total_videos > 0 else 0),
-                    'time_spent': str(progress.total_time_spent)
-                }
-            except LearningProgress.DoesNotExist:
-                return {'total': 0, 'completed': 0, 'percentage': 0, 'time_spent': '0:00:00'}
-        return {'total': 0, 'completed': 0, 'percentage': 0, 'time_spent': '0:00:00'}
+            # Annotated by Category.objects.with_stats(); fall back to a query otherwise
+            if hasattr(obj, 'progress_completed'):
+                if obj.progress_completed is None:
+                    return dict(EMPTY_PROGRESS)
+                completed, time_spent = obj.progress_completed, obj.progress_time_spent
+            else:
+                try:
+                    progress = LearningProgress.objects.get(user=request.user, category=obj)
+                except LearningProgress.DoesNotExist:
+                    return dict(EMPTY_PROGRESS)
+                completed, time_spent = progress.completed_videos, progress.total_time_spent
+            total = obj.video_count
+            return {
+                'total': total,
+                'completed': completed,
+                'percentage': int((completed / total * 100) if total > 0 else 0),
+                'time_spent': str(time_spent)
+            }
+        return dict(EMPTY_PROGRESS)
 
 class LearnVideoSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
@@ -40,6 +53,7 @@ class LearnVideoSerializer(serializers.ModelSerializer):
     progress = serializers.SerializerMethodField()
     is_new = serializers.SerializerMethodField()
     user_rating = serializers.SerializerMethodField()
+    average_rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
     
     class Meta:
         model = LearnVideo
@@ -51,39 +65,34 @@ class LearnVideoSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at', 'views', 'likes', 'average_rating']
 
-    def get_is_completed(self, obj):
+    def _watched(self, obj):
+        """
+        The requesting user's WatchedVideo for obj, or None. Views pass a
+        {video_id: WatchedVideo} map as context['watched'] (see watched_map);
+        without it this falls back to one query per call.
+        """
+        if 'watched' in self.context:
+            return self.context['watched'].get(obj.id)
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            try:
-                watched = WatchedVideo.objects.get(user=request.user, video=obj)
-                return watched.is_completed
-            except WatchedVideo.DoesNotExist:
-                return False
-        return False
+            return WatchedVideo.objects.filter(user=request.user, video=obj).first()
+        return None
+
+    def get_is_completed(self, obj):
+        watched = self._watched(obj)
+        return watched.is_completed if watched else False
 
     def get_progress(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            try:
-                watched = WatchedVideo.objects.get(user=request.user, video=obj)
-                return watched.progress
-            except WatchedVideo.DoesNotExist:
-                return 0
-        return 0
+        watched = self._watched(obj)
+        return watched.progress if watched else 0
 
     def get_is_new(self, obj):
         # Consider a video new if it was created within the last 7 days
         return (timezone.now() - obj.created_at).days <= 7
 
     def get_user_rating(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            try:
-                watched = WatchedVideo.objects.get(user=request.user, video=obj)
-                return watched.rating if hasattr(watched, 'rating') else None
-            except WatchedVideo.DoesNotExist:
-                return None
-        return None
+        watched = self._watched(obj)
+        return getattr(watched, 'rating', None) if watched else None
 
     def validate(self, data):
         errors = {}
@@ -115,6 +124,19 @@ class WatchedVideoSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Progress must be between 0 and 100")
         return value
 
+class WatchedVideoSyncEntrySerializer(serializers.Serializer):
+    video_id = serializers.IntegerField()
+    progress = serializers.IntegerField(min_value=0, max_value=100)
+    is_completed = serializers.BooleanField(required=False, default=False)
+    rating = serializers.IntegerField(min_value=1, max_value=5, required=False, allow_null=True)
+    client_ts = serializers.DateTimeField(required=False)
+
+class WatchedVideoSyncSerializer(serializers.Serializer):
+    """A batch of progress updates queued by an offline or heartbeat client."""
+    MAX_ENTRIES = 500
+
+    entries = WatchedVideoSyncEntrySerializer(many=True, allow_empty=False, max_length=MAX_ENTRIES)
+
 class LearningProgressSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), source='category', write_only=True)
@@ -0,0 +1,32 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Category, LearnVideo
+
+# Category.video_count moves by one per video created, deleted or moved between
+# categories, so adding content is a single UPDATE however many users have
+# progress in the category. Queryset update() and bulk_create() send no signals;
+# `manage.py rebuild_learning_stats` recounts after such bulk changes.
+
+def _adjust(category_id, n):
+    if category_id is not None:
+        Category.objects.filter(pk=category_id).update(video_count=F('video_count') + n)
+
+@receiver(post_init, sender=LearnVideo)
+def remember_category(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred category_id is not loaded
+    instance._saved_category_id = instance.__dict__.get('category_id')
+
+@receiver(post_save, sender=LearnVideo)
+def count_saved_video(sender, instance, created, raw=False, **kwargs):
+    if created:
+        _adjust(instance.category_id, 1)
+    elif instance._saved_category_id is not None and instance._saved_category_id != instance.category_id:
+        _adjust(instance._saved_category_id, -1)
+        _adjust(instance.category_id, 1)
+    instance._saved_category_id = instance.category_id
+
+@receiver(post_delete, sender=LearnVideo)
+def count_deleted_video(sender, instance, **kwargs):
+    _adjust(instance.category_id, -1)
@@ -1,3 +1,440 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Avg
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .counters import ViewCounterBuffer
+from .heartbeats import HeartbeatBuffer
+from .models import Category, LearnVideo, LearningProgress, UserLearningStats, WatchedVideo
+
+User = get_user_model()
+
+class LearningTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='learner', email='l@example.com', password='testpassword')
+        self.client.force_authenticate(self.user)
+
+    def make_category(self, name, videos=0):
+        category = Category.objects.create(name=name)
+        for index in range(videos):
+            LearnVideo.objects.create(
+                title=f'{name} {index}', category=category, video_file=f'learn/videos/{name}-{index}.mp4',
+                duration=timedelta(minutes=2)
+            )
+        return category
+
+    def watch(self, video, progress, is_completed=False):
+        return self.client.post('/api/learn/watched/', {
+            'video_id': video.id, 'progress': progress, 'is_completed': is_completed
+        }, format='json')
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+class CategoryVideoCountTest(LearningTestCase):
+    def test_count_follows_create_move_and_delete(self):
+        alphabet = self.make_category('Alphabet', videos=2)
+        numbers = self.make_category('Numbers', videos=1)
+        video = alphabet.videos.order_by('id').first()
+        video.category = numbers
+        video.save()
+        video.title = 'Renamed'
+        video.save()
+        alphabet.refresh_from_db()
+        numbers.refresh_from_db()
+        self.assertEqual((alphabet.video_count, numbers.video_count), (1, 2))
+
+        numbers.videos.all().delete()
+        numbers.refresh_from_db()
+        self.assertEqual(numbers.video_count, 0)
+
+    def test_new_video_updates_percentages_without_touching_progress(self):
+        alphabet = self.make_category('Alphabet', videos=2)
+        self.watch(alphabet.videos.order_by('id').first(), 100, is_completed=True)
+        progress = LearningProgress.objects.get(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.make_category('Unused')
+            LearnVideo.objects.create(title='New', category=alphabet, video_file='learn/videos/new.mp4')
+        self.assertFalse(any('learning_learningprogress' in q['sql'] for q in queries.captured_queries))
+        response = self.client.get('/api/learn/categories/')
+        alphabet_data = next(c for c in response.data if c['name'] == 'Alphabet')
+        self.assertEqual(alphabet_data['progress']['total'], 3)
+        self.assertEqual(alphabet_data['progress']['percentage'], 33)
+        self.assertEqual(LearningProgress.objects.get(pk=progress.pk).last_activity, progress.last_activity)
+
+class CategoryListQueryTest(LearningTestCase):
+    def test_query_count_does_not_grow_with_categories(self):
+        alphabet = self.make_category('Alphabet', videos=3)
+        self.make_category('Numbers', videos=1)
+        LearningProgress.objects.create(
+            user=self.user, category=alphabet, completed_videos=1, total_time_spent=timedelta(minutes=2)
+        )
+        response, baseline = self.count_queries('/api/learn/categories/')
+        alphabet_data = next(c for c in response.data if c['name'] == 'Alphabet')
+        self.assertEqual(alphabet_data['video_count'], 3)
+        self.assertEqual(alphabet_data['progress'], {'total': 3, 'completed': 1, 'percentage': 33, 'time_spent': '0:02:00'})
+        numbers_data = next(c for c in response.data if c['name'] == 'Numbers')
+        self.assertEqual(numbers_data['progress']['total'], 0)
+
+        for index in range(5):
+            self.make_category(f'Extra {index}', videos=2)
+        response, queries = self.count_queries('/api/learn/categories/')
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(queries, baseline)
+
+class VideoListQueryTest(LearningTestCase):
+    def test_query_count_does_not_grow_with_videos(self):
+        alphabet = self.make_category('Alphabet', videos=2)
+        first = alphabet.videos.order_by('id').first()
+        WatchedVideo.objects.create(user=self.user, video=first, progress=60, is_completed=True)
+        response, baseline = self.count_queries('/api/learn/videos/')
+        watched_data = next(v for v in response.data['results'] if v['id'] == first.id)
+        self.assertEqual((watched_data['progress'], watched_data['is_completed']), (60, True))
+        self.assertEqual(watched_data['category']['video_count'], 2)
+
+        self.make_category('Numbers', videos=8)
+        response, queries = self.count_queries('/api/learn/videos/')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(queries, baseline)
+
+        response, _ = self.count_queries('/api/learn/watched/')
+        self.assertEqual(response.data['results'][0]['video']['progress'], 60)
+
+class KeysetPaginationTest(LearningTestCase):
+    def test_cursor_walk_is_stable_under_inserts_and_never_offsets(self):
+        category = self.make_category('Alphabet', videos=5)
+        seen, url, params = [], '/api/learn/videos/', {'page_size': 2}
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertFalse(any('OFFSET' in q['sql'].upper() for q in queries.captured_queries))
+            seen += [video['id'] for video in response.data['results']]
+            if len(seen) == 2:
+                # A video added mid-walk sorts before the cursor and must not shift later pages
+                LearnVideo.objects.create(title='New', category=category, video_file='learn/videos/new.mp4')
+            url, params = response.data['next'], None
+        self.assertEqual(sorted(seen), sorted(category.videos.exclude(title='New').values_list('id', flat=True)))
+
+    def test_offset_fallback_is_staff_only(self):
+        self.make_category('Alphabet', videos=3)
+        response = self.client.get('/api/learn/videos/', {'limit': 2, 'offset': 1})
+        self.assertNotIn('count', response.data)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/api/learn/videos/', {'limit': 2, 'offset': 1})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/learn/watched/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class QueryPlanTest(LearningTestCase):
+    """EXPLAINs the learning hot queries on seeded data and fails on full table scans."""
+    def setUp(self):
+        super().setUp()
+        self.categories = [self.make_category(f'Category {index}', videos=20) for index in range(5)]
+        videos = list(LearnVideo.objects.all())
+        users = [self.user] + [
+            User.objects.create_user(username=f'user{index}', email=f'u{index}@example.com', password='x')
+            for index in range(10)
+        ]
+        WatchedVideo.objects.bulk_create([
+            WatchedVideo(user=user, video=video, progress=100, is_completed=index % 2 == 0, rating=index % 5 + 1)
+            for user in users for index, video in enumerate(videos[:30])
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            if connection.vendor == 'postgresql':
+                # Tiny tables are cheaper to scan; ask whether an index path exists at all
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        if connection.vendor == 'sqlite':
+            scans = [line for line in plan.splitlines() if 'SCAN' in line and 'USING' not in line]
+        else:
+            scans = [line for line in plan.splitlines() if 'Seq Scan' in line]
+        self.assertFalse(scans, f"Sequential scan in plan for:\n{queryset.query}\n{plan}")
+
+    def test_hot_queries_use_indexes(self):
+        video = LearnVideo.objects.first()
+        category = self.categories[0]
+        queries = {
+            'watch history': WatchedVideo.objects.filter(user=self.user).order_by('-last_watched_at', 'id')[:20],
+            'completed count': WatchedVideo.objects.filter(user=self.user, is_completed=True).values('id'),
+            'video rating': WatchedVideo.objects.filter(video=video, rating__isnull=False).values('rating'),
+            'video list': LearnVideo.objects.order_by('-created_at', 'id')[:20],
+            'video filter': LearnVideo.objects.filter(
+                category=category, level='beginner', is_featured=False
+            ).order_by('-created_at')[:20],
+            'featured': LearnVideo.objects.filter(is_featured=True).order_by('-created_at')[:20],
+        }
+        for name, queryset in queries.items():
+            with self.subTest(query=name):
+                self.assertUsesIndex(queryset)
+        self.assertIsNotNone(WatchedVideo.objects.filter(video=video).aggregate(Avg('rating'))['rating__avg'])
+
+class ViewCounterTest(LearningTestCase):
+    def test_detail_reads_do_not_write_the_row(self):
+        video = self.make_category('Alphabet', videos=1).videos.get()
+        buffer = ViewCounterBuffer(flush_interval=60, autostart=False)
+        with mock.patch('learning.views.VIEW_COUNTER', buffer):
+            for expected in (1, 2, 3):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(f'/api/learn/videos/{video.id}/')
+                self.assertEqual(response.data['views'], expected)
+                self.assertFalse(any(q['sql'].startswith('UPDATE') for q in queries.captured_queries))
+            updated_at = LearnVideo.objects.get(id=video.id).updated_at
+            self.assertEqual(buffer.snapshot()['pending_views'], 3)
+
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(sum(q['sql'].startswith('UPDATE') for q in queries.captured_queries), 1)
+        video.refresh_from_db()
+        self.assertEqual((video.views, video.updated_at), (3, updated_at))
+        self.assertEqual(buffer.snapshot()['pending_views'], 0)
+
+    def test_write_through_when_buffering_is_off(self):
+        video = self.make_category('Alphabet', videos=1).videos.get()
+        response = self.client.get(f'/api/learn/videos/{video.id}/')
+        self.assertEqual(response.data['views'], 1)
+        video.refresh_from_db()
+        self.assertEqual(video.views, 1)
+
+class IncrementalProgressTest(LearningTestCase):
+    def test_progress_and_stats_follow_watch_changes(self):
+        first, second = self.make_category('Alphabet', videos=2).videos.order_by('id')
+        self.assertEqual(self.watch(first, 50).status_code, status.HTTP_201_CREATED)
+        self.watch(first, 100, is_completed=True)
+        self.watch(second, 100, is_completed=True)
+        progress = LearningProgress.objects.get(user=self.user)
+        stats = UserLearningStats.objects.get(user=self.user)
+        self.assertEqual((progress.total_videos, progress.completed_videos, progress.total_time_spent), (2, 2, timedelta(minutes=4)))
+        self.assertEqual((stats.total_videos_watched, stats.total_time_spent), (2, timedelta(minutes=4)))
+
+        self.assertEqual(self.client.delete(f'/api/learn/watched/{second.id}/').status_code, status.HTTP_200_OK)
+        progress.refresh_from_db()
+        stats.refresh_from_db()
+        self.assertEqual((progress.completed_videos, progress.total_time_spent), (1, timedelta(minutes=2)))
+        self.assertEqual((stats.total_videos_watched, stats.total_time_spent), (1, timedelta(minutes=2)))
+
+    def test_update_cost_does_not_grow_with_history(self):
+        category = self.make_category('Alphabet', videos=21)
+        videos = list(category.videos.order_by('id'))
+        self.watch(videos[0], 100, is_completed=True)
+        with CaptureQueriesContext(connection) as small:
+            self.watch(videos[0], 90)
+        for video in videos[1:]:
+            WatchedVideo.objects.create(user=self.user, video=video, progress=100, is_completed=True)
+        with CaptureQueriesContext(connection) as large:
+            self.watch(videos[0], 80)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+class RatingTotalsTest(LearningTestCase):
+    def test_ratings_apply_deltas(self):
+        video = self.make_category('Alphabet', videos=1).videos.get()
+        other = User.objects.create_user(username='other', email='o@example.com', password='testpassword')
+        WatchedVideo.objects.create(user=other, video=video, rating=2)
+        LearnVideo.objects.filter(pk=video.pk).update(rating_sum=2, rating_count=1)
+
+        self.client.post('/api/learn/watched/', {'video_id': video.id, 'progress': 10, 'rating': 5}, format='json')
+        video.refresh_from_db()
+        self.assertEqual((video.rating_sum, video.rating_count, video.average_rating), (7, 2, Decimal('3.50')))
+
+        # A re-rating changes the sum only; a progress ping without a rating keeps it
+        self.client.post('/api/learn/watched/', {'video_id': video.id, 'progress': 20, 'rating': 3}, format='json')
+        self.watch(video, 30)
+        video.refresh_from_db()
+        self.assertEqual((video.rating_sum, video.rating_count), (5, 2))
+        self.assertEqual(WatchedVideo.objects.get(user=self.user).rating, 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/api/learn/watched/', {'video_id': video.id, 'progress': 40, 'rating': 4}, format='json')
+        self.assertFalse(any('AVG(' in q['sql'].upper() for q in queries.captured_queries))
+
+        self.client.delete(f'/api/learn/watched/{video.id}/')
+        video.refresh_from_db()
+        self.assertEqual((video.rating_sum, video.rating_count), (2, 1))
+        response = self.client.get(f'/api/learn/videos/{video.id}/')
+        self.assertEqual(response.data['average_rating'], '2.00')
+
+class WatchedSyncTest(LearningTestCase):
+    def sync(self, *entries):
+        return self.client.post('/api/learn/watched/sync/', {'entries': list(entries)}, format='json')
+
+    def test_sync_keeps_latest_entry_per_video(self):
+        alphabet = self.make_category('Alphabet', videos=2)
+        numbers = self.make_category('Numbers', videos=1)
+        first, second = alphabet.videos.order_by('id')
+        third = numbers.videos.get()
+        self.client.post('/api/learn/watched/', {'video_id': first.id, 'progress': 10, 'rating': 4}, format='json')
+
+        response = self.sync(
+            {'video_id': first.id, 'progress': 100, 'is_completed': True, 'client_ts': '2026-01-01T10:05:00Z'},
+            # Older than the entry above, so it is dropped even though it arrives later
+            {'video_id': first.id, 'progress': 60, 'client_ts': '2026-01-01T10:00:00Z'},
+            {'video_id': second.id, 'progress': 50, 'rating': 2},
+            {'video_id': third.id, 'progress': 100, 'is_completed': True},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'synced': 3, 'created': 2})
+
+        watched = WatchedVideo.objects.get(user=self.user, video=first)
+        self.assertEqual((watched.progress, watched.is_completed, watched.rating), (100, True, 4))
+        second.refresh_from_db()
+        self.assertEqual((second.rating_sum, second.rating_count), (2, 1))
+        progress = LearningProgress.objects.get(user=self.user, category=alphabet)
+        self.assertEqual((progress.completed_videos, progress.total_time_spent), (1, timedelta(minutes=3)))
+        stats = UserLearningStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_videos_watched, stats.total_time_spent), (2, timedelta(minutes=4)))
+
+    def test_entries_without_client_ts_fall_back_to_position(self):
+        first, second = self.make_category('Alphabet', videos=2).videos.order_by('id')
+        self.sync(
+            {'video_id': first.id, 'progress': 10},
+            {'video_id': first.id, 'progress': 80, 'client_ts': '2026-01-01T10:00:00Z'},
+            {'video_id': second.id, 'progress': 70, 'client_ts': '2026-01-01T10:00:00Z'},
+            {'video_id': second.id, 'progress': 20},
+        )
+        progress = dict(WatchedVideo.objects.filter(user=self.user).values_list('video_id', 'progress'))
+        self.assertEqual(progress, {first.id: 80, second.id: 20})
+
+    def test_unknown_video_rejects_whole_batch(self):
+        video = self.make_category('Alphabet', videos=1).videos.get()
+        response = self.sync({'video_id': video.id, 'progress': 50}, {'video_id': video.id + 100, 'progress': 50})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(WatchedVideo.objects.exists())
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        videos = list(self.make_category('Alphabet', videos=12).videos.order_by('id'))
+        self.sync({'video_id': videos[0].id, 'progress': 10})
+        with CaptureQueriesContext(connection) as small:
+            self.sync(*({'video_id': video.id, 'progress': 20} for video in videos[:2]))
+        with CaptureQueriesContext(connection) as large:
+            self.sync(*({'video_id': video.id, 'progress': 30} for video in videos))
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+class HeartbeatBufferTest(LearningTestCase):
+    def setUp(self):
+        super().setUp()
+        self.buffer = HeartbeatBuffer(flush_interval=60, autostart=False)
+        patcher = mock.patch('learning.views.HEARTBEATS', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pings_are_coalesced_until_flush(self):
+        first, second = self.make_category('Alphabet', videos=2).videos.order_by('id')
+        with CaptureQueriesContext(connection) as queries:
+            for progress in (10, 20, 30):
+                self.assertEqual(self.watch(first, progress).status_code, status.HTTP_202_ACCEPTED)
+            self.watch(second, 50)
+        self.assertFalse(any(q['sql'].startswith(('INSERT', 'UPDATE')) for q in queries.captured_queries))
+        self.assertEqual(self.buffer.pending(self.user.pk, first.id), {'progress': 30, 'is_completed': False})
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(WatchedVideo.objects.get(user=self.user, video=first).progress, 30)
+        progress = LearningProgress.objects.get(user=self.user)
+        self.assertEqual(progress.total_time_spent, timedelta(seconds=36 + 60))
+        self.assertEqual(self.buffer.snapshot()['pending'], 0)
+
+    def test_completion_and_reads_flush_the_users_state(self):
+        first, second = self.make_category('Alphabet', videos=2).videos.order_by('id')
+        self.watch(first, 40)
+        response = self.client.get('/api/learn/stats/')
+        self.assertEqual(response.data['categoryProgress'][0]['total_time_spent'], '00:00:48')
+
+        self.watch(second, 100, is_completed=True)
+        self.assertTrue(WatchedVideo.objects.get(user=self.user, video=second).is_completed)
+        self.assertEqual(UserLearningStats.objects.get(user=self.user).total_videos_watched, 1)
+
+    def test_overlapping_flushes_of_a_user_write_in_order(self):
+        video = self.make_category('Alphabet', videos=1).videos.get()
+        self.buffer.record(self.user, video.id, 30, False)
+        written, blocked = [], []
+
+        def slow_upsert(user, videos, entries):
+            written.append(entries[video.id]['progress'])
+            if len(written) == 1:
+                # A newer ping and a second flush arrive while the first write is in flight
+                self.buffer.record(self.user, video.id, 40, False)
+                second = threading.Thread(target=self.buffer.flush, kwargs={'user_id': self.user.pk})
+                second.start()
+                second.join(0.2)
+                blocked.append(second)
+            return 0
+
+        queryset = mock.Mock()
+        queryset.only.return_value.in_bulk.return_value = {video.id: video}
+        with mock.patch('learning.heartbeats.upsert_watched', side_effect=slow_upsert), \
+                mock.patch('learning.heartbeats.LearnVideo.objects', queryset):
+            self.buffer.flush(user_id=self.user.pk)
+            self.assertTrue(blocked[0].is_alive())
+            blocked[0].join(5)
+        self.assertEqual(written, [30, 40])
+
+    def test_only_completion_changes_flush_early(self):
+        video = self.make_category('Alphabet', videos=1).videos.get()
+        self.watch(video, 100, is_completed=True)
+        self.assertTrue(WatchedVideo.objects.get(user=self.user).is_completed)
+
+        # Rewatching a completed video: pings stay buffered
+        with CaptureQueriesContext(connection) as queries:
+            for progress in (10, 20):
+                self.watch(video, progress, is_completed=True)
+        self.assertFalse(any(q['sql'].startswith(('INSERT', 'UPDATE')) for q in queries.captured_queries))
+        self.assertEqual(self.buffer.pending(self.user.pk, video.id), {'progress': 20, 'is_completed': True})
+
+        self.watch(video, 30)
+        self.assertIsNone(self.buffer.pending(self.user.pk, video.id))
+        self.assertFalse(WatchedVideo.objects.get(user=self.user).is_completed)
+
+    def test_rated_post_supersedes_pending_ping(self):
+        video = self.make_category('Alphabet', videos=1).videos.get()
+        self.watch(video, 90)
+        response = self.client.post('/api/learn/watched/', {'video_id': video.id, 'progress': 20, 'rating': 4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(WatchedVideo.objects.get(user=self.user).progress, 20)
+
+class RebuildLearningStatsTest(LearningTestCase):
+    def test_rebuild_repairs_both_tables(self):
+        alphabet = self.make_category('Alphabet', videos=3)
+        numbers = self.make_category('Numbers', videos=1)
+        first, second, third = alphabet.videos.order_by('id')
+        WatchedVideo.objects.create(user=self.user, video=first, progress=100, is_completed=True)
+        WatchedVideo.objects.create(user=self.user, video=second, progress=50)
+        other = User.objects.create_user(username='other', email='o@example.com', password='testpassword')
+        WatchedVideo.objects.create(user=other, video=third, progress=100, is_completed=True)
+        # Stale rows: wrong totals, and progress in a category with no watch history left
+        LearningProgress.objects.create(user=self.user, category=alphabet, completed_videos=9, total_time_spent=timedelta(hours=1))
+        LearningProgress.objects.create(user=self.user, category=numbers, completed_videos=1)
+        Category.objects.filter(pk=numbers.pk).update(video_count=5)
+        UserLearningStats.objects.create(user=self.user, total_videos_watched=7, current_streak=4)
+
+        out = StringIO()
+        call_command('rebuild_learning_stats', '--chunk-size', '1', stdout=out)
+        self.assertIn('2/2 users', out.getvalue())
+        self.assertEqual(Category.objects.get(pk=numbers.pk).video_count, 1)
 
-# Create your tests here.
+        progress = LearningProgress.objects.get(user=self.user, category=alphabet)
+        self.assertEqual((progress.total_videos, progress.completed_videos, progress.total_time_spent), (3, 1, timedelta(minutes=3)))
+        stale = LearningProgress.objects.get(user=self.user, category=numbers)
+        self.assertEqual((stale.total_videos, stale.completed_videos), (1, 0))
+        stats = UserLearningStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_videos_watched, stats.total_time_spent, stats.current_streak), (1, timedelta(minutes=2), 4))
+        self.assertEqual(UserLearningStats.objects.get(user=other).total_videos_watched, 1)
@@ -11,9 +11,11 @@ urlpatterns = [
     
     # Progress tracking endpoints
     path('watched/', views.WatchedVideoListCreateView.as_view(), name='watched-list'),
+    path('watched/sync/', views.WatchedVideoSyncView.as_view(), name='watched-sync'),
     path('watched/<int:video_id>/', views.WatchedVideoDeleteView.as_view(), name='watched-delete'),
     path('watched/recent/', views.RecentActivityView.as_view(), name='recent-activity'),
     
     # Stats endpoint
     path('stats/', views.LearnStatsView.as_view(), name='learn-stats'),
+    path('metrics/', views.LearnMetricsView.as_view(), name='learn-metrics'),
 ]
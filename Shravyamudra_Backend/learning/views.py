@@ -3,29 +3,41 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import Category, LearnVideo, WatchedVideo, LearningProgress, UserLearningStats
 from .serializers import (
-    CategorySerializer, LearnVideoSerializer, WatchedVideoSerializer,
-    LearningProgressSerializer, UserLearningStatsSerializer
+    CategorySerializer, LearnVideoSerializer, WatchedVideoSerializer, WatchedVideoSyncSerializer,
+    LearningProgressSerializer, UserLearningStatsSerializer, watched_map
 )
+from .counters import VIEW_COUNTER
+from .heartbeats import HEARTBEATS
+from .progress import apply_rating_change, apply_watch_change, upsert_watched, watch_state
+from .pagination import LearnVideoPagination, WatchedVideoPagination
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from django.db.models import Count, Q, Avg
+from django.db.models import Count, Q, Avg, Prefetch
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 
+def category_prefetch(user, lookup='category'):
+    """Loads the related categories with their stats in one extra query."""
+    return Prefetch(lookup, queryset=Category.objects.with_stats(user))
+
 class CategoryListView(generics.ListAPIView):
-    queryset = Category.objects.all().order_by('order', 'name')
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        return Category.objects.with_stats(self.request.user).order_by('order', 'name')
+
 class LearnVideoListView(generics.ListCreateAPIView):
     serializer_class = LearnVideoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = LearnVideoPagination
     parser_classes = (MultiPartParser, FormParser)
 
     def get_queryset(self):
-        queryset = LearnVideo.objects.all()
+        queryset = LearnVideo.objects.prefetch_related(category_prefetch(self.request.user))
         
         # Filter by category
         category_param = self.request.query_params.get('category')
@@ -47,23 +59,37 @@ class LearnVideoListView(generics.ListCreateAPIView):
 
         return queryset.order_by('-created_at')
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        videos = list(queryset) if page is None else page
+        context = {**self.get_serializer_context(), 'watched': watched_map(request.user, videos)}
+        serializer = self.get_serializer(videos, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         if not self.request.user.is_staff:
             raise PermissionDenied("Only admin users can create videos")
         serializer.save()
 
 class LearnVideoDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = LearnVideo.objects.all()
     serializer_class = LearnVideoSerializer
     permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser)
 
+    def get_queryset(self):
+        return LearnVideo.objects.prefetch_related(category_prefetch(self.request.user))
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Increment views when video is retrieved
-        instance.views += 1
-        instance.save()
-        serializer = self.get_serializer(instance)
+        # Count the view without writing the row; VIEW_COUNTER flushes counts in batches
+        VIEW_COUNTER.increment(instance.id)
+        # Show the views not yet flushed (at least this one) without re-reading the row
+        instance.views += max(VIEW_COUNTER.pending(instance.id), 1)
+        context = {**self.get_serializer_context(), 'watched': watched_map(request.user, [instance])}
+        serializer = self.get_serializer(instance, context=context)
         return Response(serializer.data)
 
     def update(self, request, *args, **kwargs):
@@ -76,6 +102,12 @@ class LearnVideoDetailView(generics.RetrieveUpdateDestroyAPIView):
             raise PermissionDenied("Only admin users can delete videos")
         return super().destroy(request, *args, **kwargs)
 
+class LearnMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'viewCounter': VIEW_COUNTER.snapshot(), 'heartbeats': HEARTBEATS.snapshot()})
+
 class LearnStatsView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -83,13 +115,15 @@ class LearnStatsView(APIView):
         user = request.user
         now = timezone.now()
         week_ago = now - timedelta(days=7)
+        # Users see their own latest progress, not the last flushed one
+        HEARTBEATS.flush(user_id=user.pk)
 
         # Get user's learning stats
         user_stats, _ = UserLearningStats.objects.get_or_create(user=user)
         user_stats_serializer = UserLearningStatsSerializer(user_stats)
 
         # Get category-wise progress
-        category_progress = LearningProgress.objects.filter(user=user)
+        category_progress = LearningProgress.objects.filter(user=user).prefetch_related(category_prefetch(user))
         category_progress_serializer = LearningProgressSerializer(category_progress, many=True)
 
         # Get recent activity
@@ -120,9 +154,18 @@ class WatchedVideoListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        watched = WatchedVideo.objects.filter(user=request.user)
-        serializer = WatchedVideoSerializer(watched, many=True)
-        return Response(serializer.data)
+        HEARTBEATS.flush(user_id=request.user.pk)
+        paginator = WatchedVideoPagination()
+        watched = paginator.paginate_queryset(
+            WatchedVideo.objects.filter(user=request.user).select_related('video').prefetch_related(
+                category_prefetch(request.user, 'video__category')
+            ),
+            request, view=self
+        )
+        serializer = WatchedVideoSerializer(watched, many=True, context={
+            'request': request, 'watched': {w.video_id: w for w in watched}
+        })
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         serializer = WatchedVideoSerializer(data=request.data, context={'request': request})
@@ -132,27 +175,35 @@ class WatchedVideoListCreateView(APIView):
             is_completed = serializer.validated_data.get('is_completed', False)
             rating = serializer.validated_data.get('rating')
 
-            watched, created = WatchedVideo.objects.update_or_create(
-                user=request.user,
-                video=video,
-                defaults={
+            # Plain progress pings are coalesced in memory; ratings are written at once
+            if rating is None and HEARTBEATS.enabled:
+                HEARTBEATS.record(request.user, video.id, progress, is_completed)
+                return Response({'detail': 'Progress recorded.'}, status=status.HTTP_202_ACCEPTED)
+            HEARTBEATS.discard(request.user.pk, video.id)
+
+            with transaction.atomic():
+                previous = WatchedVideo.objects.select_for_update().filter(user=request.user, video=video).first()
+                old_state = watch_state(previous)
+                defaults = {
                     'progress': progress,
                     'is_completed': is_completed,
-                    'rating': rating,
                     'last_watched_at': timezone.now()
                 }
-            )
-
-            # Update video stats if rating is provided
-            if rating:
-                video.average_rating = WatchedVideo.objects.filter(
-                    video=video
-                ).aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-                video.save()
-
-            # Update learning progress
-            self._update_learning_progress(request.user, video.category)
-            self._update_user_stats(request.user, video)
+                # Progress pings without a rating keep the user's earlier rating
+                if rating is not None:
+                    defaults['rating'] = rating
+                watched, created = WatchedVideo.objects.update_or_create(
+                    user=request.user,
+                    video=video,
+                    defaults=defaults
+                )
+
+                # Update the video's running rating totals by the change alone
+                if rating is not None:
+                    apply_rating_change(video, previous.rating if previous else None, rating)
+
+                # Update learning progress and stats from the change alone
+                apply_watch_change(request.user, video, old_state, watch_state(watched))
 
             return Response(
                 {'detail': 'Progress updated successfully.'},
@@ -160,129 +211,67 @@ class WatchedVideoListCreateView(APIView):
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def _update_learning_progress(self, user, category):
-        total_videos = LearnVideo.objects.filter(category=category).count()
-        completed_videos = WatchedVideo.objects.filter(
-            user=user,
-            video__category=category,
-            is_completed=True
-        ).count()
-
-        # Calculate total time spent in this category
-        total_time = timedelta()
-        for watched in WatchedVideo.objects.filter(user=user, video__category=category):
-            if watched.video.duration:
-                total_time += watched.video.duration * (watched.progress / 100)
-
-        LearningProgress.objects.update_or_create(
-            user=user,
-            category=category,
-            defaults={
-                'total_videos': total_videos,
-                'completed_videos': completed_videos,
-                'total_time_spent': total_time,
-                'last_activity': timezone.now()
-            }
-        )
-
-    def _update_user_stats(self, user, video):
-        stats, _ = UserLearningStats.objects.get_or_create(user=user)
-        
-        # Update total videos watched
-        stats.total_videos_watched = WatchedVideo.objects.filter(
-            user=user,
-            is_completed=True
-        ).count()
-
-        # Update total time spent
-        total_time = timedelta()
-        for watched in WatchedVideo.objects.filter(user=user, is_completed=True):
-            if watched.video.duration:
-                total_time += watched.video.duration
-
-        stats.total_time_spent = total_time
-
-        # Update streak
-        today = timezone.now().date()
-        yesterday = today - timedelta(days=1)
-        
-        if stats.last_activity.date() == yesterday:
-            stats.current_streak += 1
-            if stats.current_streak > stats.longest_streak:
-                stats.longest_streak = stats.current_streak
-        elif stats.last_activity.date() < yesterday:
-            stats.current_streak = 1
+class WatchedVideoSyncView(APIView):
+    """
+    Applies a queued batch of progress updates in one request. Entries are
+    collapsed to the latest state per video (by client_ts when both entries
+    have one, else by position),
+    written with a single upsert, and the derived progress and stats are
+    adjusted once per affected category.
+    """
+    permission_classes = [IsAuthenticated]
 
-        stats.last_activity = timezone.now()
-        stats.save()
+    def post(self, request):
+        serializer = WatchedVideoSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        latest = {}
+        for entry in serializer.validated_data['entries']:
+            current = latest.get(entry['video_id'])
+            # client_ts only orders two entries that both carry one; otherwise the later entry in the list wins
+            if current is None or not (entry.get('client_ts') and current.get('client_ts')) \
+                    or entry['client_ts'] >= current['client_ts']:
+                latest[entry['video_id']] = entry
+
+        videos = LearnVideo.objects.only('id', 'category_id', 'duration').in_bulk(latest)
+        missing = sorted(set(latest) - set(videos))
+        if missing:
+            return Response({'entries': [f'Unknown video_id: {video_id}' for video_id in missing]},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Write buffered heartbeats first so a later flush cannot overwrite the batch
+        HEARTBEATS.flush(user_id=request.user.pk)
+        created = upsert_watched(request.user, videos, latest)
+        for video_id in latest:
+            HEARTBEATS.discard(request.user.pk, video_id)
+        return Response({'synced': len(latest), 'created': created}, status=status.HTTP_200_OK)
 
 class WatchedVideoDeleteView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request, video_id):
-        try:
-            watched = WatchedVideo.objects.get(user=request.user, video_id=video_id)
-            video = watched.video
+        HEARTBEATS.flush(user_id=request.user.pk)
+        HEARTBEATS.discard(request.user.pk, video_id)
+        with transaction.atomic():
+            watched = WatchedVideo.objects.select_for_update().select_related('video').filter(
+                user=request.user, video_id=video_id
+            ).first()
+            if watched is None:
+                return Response(
+                    {'detail': 'Video not found in watched list.'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            old_state = watch_state(watched)
             watched.delete()
-
-            # Update learning progress
-            self._update_learning_progress(request.user, video.category)
-            self._update_user_stats(request.user, video)
-
-            return Response({'detail': 'Video removed from watched list.'}, status=status.HTTP_200_OK)
-        except WatchedVideo.DoesNotExist:
-            return Response(
-                {'detail': 'Video not found in watched list.'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-    def _update_learning_progress(self, user, category):
-        total_videos = LearnVideo.objects.filter(category=category).count()
-        completed_videos = WatchedVideo.objects.filter(
-            user=user,
-            video__category=category,
-            is_completed=True
-        ).count()
-
-        # Calculate total time spent in this category
-        total_time = timedelta()
-        for watched in WatchedVideo.objects.filter(user=user, video__category=category):
-            if watched.video.duration:
-                total_time += watched.video.duration * (watched.progress / 100)
-
-        LearningProgress.objects.update_or_create(
-            user=user,
-            category=category,
-            defaults={
-                'total_videos': total_videos,
-                'completed_videos': completed_videos,
-                'total_time_spent': total_time,
-                'last_activity': timezone.now()
-            }
-        )
-
-    def _update_user_stats(self, user, video):
-        stats, _ = UserLearningStats.objects.get_or_create(user=user)
-        
-        # Update total videos watched
-        stats.total_videos_watched = WatchedVideo.objects.filter(
-            user=user,
-            is_completed=True
-        ).count()
-
-        # Update total time spent
-        total_time = timedelta()
-        for watched in WatchedVideo.objects.filter(user=user, is_completed=True):
-            if watched.video.duration:
-                total_time += watched.video.duration
-
-        stats.total_time_spent = total_time
-        stats.save()
+            apply_watch_change(request.user, watched.video, old_state, None, update_streak=False)
+            apply_rating_change(watched.video, watched.rating, None)
+        return Response({'detail': 'Video removed from watched list.'}, status=status.HTTP_200_OK)
 
 class RecentActivityView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        HEARTBEATS.flush(user_id=request.user.pk)
         recent_activity = WatchedVideo.objects.filter(
             user=request.user
         ).select_related('video').order_by('-last_watched_at')[:10]
@@ -1,6 +1,33 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 
+def is_serving() -> bool:
+    """
+    True in a process that serves requests: a WSGI/ASGI server, or the child
+    process of runserver (not the autoreloader parent, not other commands).
+    """
+    program = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if program not in ('manage.py', 'django-admin'):
+        return True
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command != 'runserver':
+        return False
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+
+
 class TranslationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'translation'
+
+    def ready(self):
+        from django.conf import settings
+        if settings.OLLAMA_PREWARM_ON_STARTUP and settings.OLLAMA_PREWARM_MODELS and is_serving():
+            from .ollama_api import start_keep_warm
+            start_keep_warm(
+                settings.OLLAMA_PREWARM_MODELS,
+                interval=settings.OLLAMA_KEEP_WARM_INTERVAL,
+                hours=settings.OLLAMA_KEEP_WARM_HOURS,
+            )
@@ -0,0 +1,347 @@
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import ollama_api, pipeline
+from .scheduler import FairScheduler
+from .sentences import split_into_sentences
+from .views import TranslationAPIView
+
+# --- Offline translation benchmark ---
+# Drives TranslationAPIView in-process against MockOllamaServer, a local stand-in
+# for Ollama's /api/tags and /api/generate with configurable latency and
+# injected failures, so runs are repeatable without a GPU or a real model.
+# Used by `manage.py bench_translation` and the test suite.
+
+SAMPLE_SENTENCES = [
+    "The red car is fast.",
+    "Have you eaten breakfast?",
+    "I will visit my grandmother next week.",
+    "My brother does not like spicy food.",
+    "Where is the nearest hospital?",
+]
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parses a latency distribution in seconds: "fixed:0.2", "uniform:0.1:0.5"
+    or "lognormal:<mu>:<sigma>" (of the underlying normal, in log-seconds).
+    """
+    kind, *params = spec.split(':')
+    try:
+        values = [float(p) for p in params]
+        if kind == 'fixed' and len(values) == 1:
+            return lambda rng: values[0]
+        if kind == 'uniform' and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1])
+        if kind == 'lognormal' and len(values) == 2:
+            return lambda rng: rng.lognormvariate(values[0], values[1])
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+class MockOllamaServer:
+    """
+    Minimal Ollama imitation. Every /api/generate call sleeps for a sampled
+    latency, then fails with HTTP 500 at `error_rate` or streams `gloss` back
+    a word per chunk.
+    """
+    def __init__(self, latency: str = 'fixed:0.05', error_rate: float = 0.0, models: Optional[List[str]] = None,
+                 gloss: str = 'I TEA LIKE', seed: Optional[int] = None):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.models = models or ['mistral', 'gemma3:1b']
+        self.gloss = gloss
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self.counts = {'tags': 0, 'generate': 0, 'errors': 0}
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def _draw(self):
+        with self._lock:
+            return self.sample_latency(self._rng), self._rng.random() < self.error_rate
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def start(self) -> 'MockOllamaServer':
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send_json(self, code, body):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path != '/api/tags':
+                    return self._send_json(404, {'error': 'not found'})
+                mock._count('tags')
+                self._send_json(200, {'models': [{'name': name} for name in mock.models]})
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if self.path != '/api/generate':
+                    return self._send_json(404, {'error': 'not found'})
+                mock._count('generate')
+                if not payload.get('prompt'):
+                    # Prewarm request: load only
+                    return self._send_json(200, {'model': payload.get('model'), 'response': '', 'done': True})
+                latency, fail = mock._draw()
+                time.sleep(latency)
+                if fail:
+                    mock._count('errors')
+                    return self._send_json(500, {'error': 'injected failure'})
+                words = mock.gloss.split()
+                if not payload.get('stream', True):
+                    return self._send_json(200, {'response': mock.gloss, 'done': True})
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    chunks = [{'response': word + ' ', 'done': False} for word in words]
+                    chunks.append({'response': '\n', 'done': True})
+                    for chunk in chunks:
+                        line = json.dumps(chunk).encode() + b'\n'
+                        self.wfile.write(f'{len(line):x}\r\n'.encode() + line + b'\r\n')
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client hung up after the first gloss line, as it should
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+def _summary(samples: List[float]) -> Dict:
+    return {
+        'count': len(samples),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 2) if samples else 0.0,
+        'p50_ms': round(_percentile(samples, 50) * 1000, 2),
+        'p95_ms': round(_percentile(samples, 95) * 1000, 2),
+        'p99_ms': round(_percentile(samples, 99) * 1000, 2),
+    }
+
+class PhaseTimer:
+    """Collects wall time per named phase from any thread."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+
+    def wrap(self, phase: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.samples.setdefault(phase, []).append(time.perf_counter() - start)
+        return timed
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {phase: _summary(samples) for phase, samples in self.samples.items()}
+
+# ollama_api functions timed per phase; "generate" includes the cleanup of the lines it reads
+PHASES = {
+    'wait_for_ollama': 'probe',
+    'check_model_availability': 'probe',
+    'call_ollama_for_sentence': 'generate',
+    'clean_gloss_line': 'cleanup',
+}
+
+@contextmanager
+def _instrumented(server_url: str, timer: PhaseTimer, rate_limited: bool):
+    """
+    Points ollama_api at the mock server and wraps the phase functions for the duration.
+    Unless rate_limited, the per-user token bucket is lifted so the run measures
+    the concurrency limit rather than the rate limit.
+    """
+    originals = {name: getattr(ollama_api, name) for name in PHASES}
+    original_url, original_scheduler = ollama_api.OLLAMA_URL, pipeline.OLLAMA_SCHEDULER
+    ollama_api.OLLAMA_URL = server_url
+    for name, phase in PHASES.items():
+        setattr(ollama_api, name, timer.wrap(phase, originals[name]))
+    if not rate_limited:
+        pipeline.OLLAMA_SCHEDULER = FairScheduler(
+            max_concurrency=original_scheduler.max_concurrency, max_queue=original_scheduler.max_queue,
+            rate=1e9, burst=1e9,
+        )
+    try:
+        yield
+    finally:
+        ollama_api.OLLAMA_URL = original_url
+        pipeline.OLLAMA_SCHEDULER = original_scheduler
+        for name, func in originals.items():
+            setattr(ollama_api, name, func)
+
+def run_benchmark(server: MockOllamaServer, concurrency_levels: List[int], requests_per_level: int = 40,
+                  sentences_per_request: int = 1, model: str = 'mistral', options: Optional[Dict] = None,
+                  rate_limited: bool = False) -> Dict:
+    """
+    Sends `requests_per_level` POSTs to TranslationAPIView at each concurrency level.
+    Each worker thread acts as its own user. Returns a JSON-serialisable report
+    with throughput, latency percentiles, status counts and per-phase timings.
+    """
+    # Memory and rule hits would skip the LLM entirely, so they are off unless asked for
+    options = {'rules_first': False, 'memory': False, **(options or {})}
+    factory = APIRequestFactory()
+    view = TranslationAPIView.as_view()
+    User = get_user_model()
+    user_ids = itertools.count(1)
+    results = []
+
+    for level in concurrency_levels:
+        timer = PhaseTimer()
+        latencies, statuses, sentence_statuses = [], {}, {}
+        lock = threading.Lock()
+        local = threading.local()
+
+        def one_request(index):
+            if not hasattr(local, 'user'):
+                # Unsaved users: record_translation skips them, so the run writes no history
+                user_id = next(user_ids)
+                local.user = User(id=user_id, username=f'bench-{user_id}')
+            text = ' '.join(SAMPLE_SENTENCES[(index + i) % len(SAMPLE_SENTENCES)] for i in range(sentences_per_request))
+            request = factory.post('/api/translation/translate/', {'text': text, 'model': 'local', 'options': {
+                'ollama_model': model, **options
+            }}, format='json')
+            force_authenticate(request, user=local.user)
+            start = time.perf_counter()
+            response = view(request)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                for sentence in response.data.get('sentences', []):
+                    sentence_statuses[sentence['status']] = sentence_statuses.get(sentence['status'], 0) + 1
+
+        with _instrumented(server.url, timer, rate_limited):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as executor:
+                list(executor.map(one_request, range(requests_per_level)))
+            wall = time.perf_counter() - start
+
+        results.append({
+            'concurrency': level,
+            'requests': requests_per_level,
+            'wall_seconds': round(wall, 3),
+            'throughput_rps': round(requests_per_level / wall, 2) if wall else 0.0,
+            'latency': _summary(latencies),
+            'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+            'sentence_statuses': sentence_statuses,
+            'phases': timer.report(),
+        })
+
+    return {
+        'config': {
+            'requests_per_level': requests_per_level,
+            'sentences_per_request': sentences_per_request,
+            'model': model,
+            'options': options,
+            'rate_limited': rate_limited,
+            'error_rate': server.error_rate,
+            'llm_max_concurrency': settings.TRANSLATION_LLM_MAX_CONCURRENCY,
+        },
+        'levels': results,
+    }
+
+# --- Sentence splitter micro-benchmark ---
+# Times split_into_sentences alone, in-process, on the correctness corpus the
+# tests use and on a long document built from it. Used by
+# `manage.py bench_sentence_splitter`; numbers are reported, never asserted.
+
+# (text, expected sentences)
+SPLITTER_CORPUS = [
+    ('Hello Dr. Smith. How are you?', ['Hello Dr. Smith.', 'How are you?']),
+    ('Pi is 3.14. Nice!', ['Pi is 3.14.', 'Nice!']),
+    ('Use fruit, e.g. apples. Then eat.', ['Use fruit, e.g. apples.', 'Then eat.']),
+    ('Wait... what? Well... Okay then.', ['Wait... what?', 'Well...', 'Okay then.']),
+    ('He said "Go home." Then he left.', ['He said "Go home."', 'Then he left.']),
+    ('A. P. J. Abdul Kalam was great. So did I. Yes.', ['A. P. J. Abdul Kalam was great.', 'So did I.', 'Yes.']),
+    ('Really?! Yes.', ['Really?!', 'Yes.']),
+    ('(See below.) Next.', ['(See below.)', 'Next.']),
+    ('I said no. No. 5 is here.', ['I said no.', 'No. 5 is here.']),
+    ('First paragraph\n\nSecond paragraph', ['First paragraph', 'Second paragraph']),
+    ('  no punctuation  ', ['no punctuation']),
+    ('', []),
+]
+
+
+def _time_split(text: str, repeat: int) -> Dict:
+    samples = []
+    sentences = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sentences = len(split_into_sentences(text))
+        samples.append(time.perf_counter() - start)
+    return {'chars': len(text), 'sentences': sentences, 'timing': _summary(samples)}
+
+def run_splitter_benchmark(repeat: int = 50, document_copies: int = 200) -> Dict:
+    """
+    Splits the whole corpus `repeat` times, then a document of `document_copies`
+    copies of the corpus (joined by blank lines) `repeat` times. Returns a JSON-serialisable report.
+    """
+    # One sample per pass over the whole corpus; single short entries are below timer resolution
+    corpus_passes = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text, _ in SPLITTER_CORPUS:
+            split_into_sentences(text)
+        corpus_passes.append(time.perf_counter() - start)
+    document = '\n\n'.join(text for text, _ in SPLITTER_CORPUS) * document_copies
+    report = _time_split(document, repeat)
+    return {
+        'config': {'repeat': repeat, 'document_copies': document_copies},
+        'corpus': {
+            'entries': len(SPLITTER_CORPUS),
+            'sentences': sum(len(split_into_sentences(text)) for text, _ in SPLITTER_CORPUS),
+            'timing': _summary(corpus_passes),
+        },
+        'document': {
+            **report,
+            'sentences_per_second': round(report['sentences'] / (report['timing']['mean_ms'] / 1000), 1)
+            if report['timing']['mean_ms'] else None,
+        },
+    }
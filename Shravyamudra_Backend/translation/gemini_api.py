@@ -1,25 +1,19 @@
 # --- Required Libraries ---
-import google.generativeai as genai
+# Calls go straight to the generated GenerativeServiceClient of
+# google-ai-generativelanguage (pinned in requirements.txt) through its public
+# generate_content(); the higher-level google-generativeai wrapper only offers a
+# process-global genai.configure() for keys.
+from google.ai import generativelanguage as glm
+from google.api_core import gapic_v1
+import hashlib
 import os
 import sys
-import nltk # Natural Language Toolkit for sentence tokenization
-
-# --- Download NLTK 'punkt' data if not already present ---
-try:
-    from nltk.tokenize import sent_tokenize
-    nltk.data.find('tokenizers/punkt')
-except (LookupError, AttributeError):
-    print("NLTK 'punkt' tokenizer models not found or download needed.")
-    print("Attempting to download 'punkt'...")
-    try:
-        nltk.download('punkt', quiet=True)
-        from nltk.tokenize import sent_tokenize # Re-import after download
-        print("'punkt' downloaded successfully.")
-    except Exception as download_exc:
-        print(f"ERROR: Failed to download 'punkt': {download_exc}")
-        print("\nPlease ensure you have internet connectivity and appropriate permissions.")
-        print("Alternatively, download manually: run 'python', then 'import nltk; nltk.download(\"punkt\")'")
-        sys.exit(1)
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .sentences import split_into_sentences
 
 ISL_PROMPT_TEMPLATE = '''You are an expert in Indian Sign Language (ISL) translation. Translate the following English text into grammatically correct ISL gloss, adhering to natural ISL structure and using standard UPPERCASE gloss. Provide ONLY the ISL gloss translation, with each English sentence translated on a new line:
 
@@ -28,37 +22,90 @@ ISL_PROMPT_TEMPLATE = '''You are an expert in Indian Sign Language (ISL) transla
 """
 '''
 
+# Override the API host, e.g. "http://127.0.0.1:8080" for a local stub (default: Google's endpoint)
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT') or None
+GEMINI_CLIENT_CACHE_SIZE = int(os.getenv('GEMINI_CLIENT_CACHE_SIZE', '256'))
+GEMINI_CLIENT_IDLE_SECONDS = float(os.getenv('GEMINI_CLIENT_IDLE_SECONDS', '900'))
+
+# --- Per-key client cache ---
+# genai.configure() would swap a process-global client, so concurrent requests with
+# different users' keys could send one user's prompt with another's key. Each
+# key instead gets its own client, reused across calls and dropped after
+# GEMINI_CLIENT_IDLE_SECONDS without use or when the cache is full (LRU).
+# Entries are keyed by a hash so raw keys are not kept as dict keys.
+
+class GeminiClientCache:
+    def __init__(self, max_size: int = 256, idle_seconds: float = 900, endpoint: Optional[str] = None):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self.endpoint = endpoint
+        self._clients = OrderedDict()  # key hash -> (client, last used)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def _make_client(self, api_key: str):
+        client_options = {'api_key': api_key}
+        if self.endpoint:
+            client_options['api_endpoint'] = self.endpoint
+        return glm.GenerativeServiceClient(transport='rest', client_options=client_options)
+
+    def get_client(self, api_key: str) -> glm.GenerativeServiceClient:
+        """Returns this key's client, creating it on first use."""
+        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            # Drop idle clients from the LRU end
+            while self._clients:
+                oldest_hash, (_, last_used) = next(iter(self._clients.items()))
+                if now - last_used <= self.idle_seconds:
+                    break
+                del self._clients[oldest_hash]
+            entry = self._clients.get(key_hash)
+            client = entry[0] if entry else self._make_client(api_key)
+            self._clients[key_hash] = (client, now)
+            self._clients.move_to_end(key_hash)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+        return client
+
+GEMINI_CLIENTS = GeminiClientCache(GEMINI_CLIENT_CACHE_SIZE, GEMINI_CLIENT_IDLE_SECONDS, GEMINI_API_ENDPOINT)
+
 # --- Function to Call Gemini API (Handles one sentence at a time) ---
-def call_gemini_api(api_key: str, input_text: str, model_name: str = "gemini-1.5-flash-latest") -> str:
+def call_gemini_api(api_key: str, input_text: str, model_name: str = "gemini-1.5-flash-latest",
+                    timeout: Optional[float] = None) -> str:
     """
-    Calls the Gemini API using the google-genai SDK with the ISL translation
-    prompt template for a SINGLE sentence. Returns the standard uppercase ISL gloss.
-    # ... (rest of the function definition is unchanged) ...
+    Calls the Gemini API with the ISL translation prompt template for a SINGLE
+    sentence, using this key's cached client. Returns the standard uppercase ISL gloss.
     """
     try:
-        genai.configure(api_key=api_key)
+        client = GEMINI_CLIENTS.get_client(api_key)
     except Exception as e:
-        raise Exception(f"Failed to configure GenAI SDK: {str(e)}")
+        raise Exception(f"Failed to create Gemini client: {str(e)}")
 
     prompt = ISL_PROMPT_TEMPLATE.format(input_text=input_text)
 
     try:
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
-
-        if response.parts:
-            raw_isl_gloss = response.text.strip()
+        response = client.generate_content(
+            model=f"models/{model_name}",
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+            timeout=gapic_v1.method.DEFAULT if timeout is None else timeout,
+        )
+
+        parts = response.candidates[0].content.parts if response.candidates else []
+        if parts:
+            raw_isl_gloss = "".join(part.text for part in parts).strip()
             if not raw_isl_gloss:
                  raise Exception("Gemini API returned an empty string.")
             return raw_isl_gloss
-        elif hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
+        elif response.prompt_feedback.block_reason:
              block_reason = response.prompt_feedback.block_reason
              safety_ratings = response.prompt_feedback.safety_ratings
              raise Exception(f"Gemini API request blocked. Reason: {block_reason}. Ratings: {safety_ratings}")
         else:
             candidate_info = response.candidates[0].finish_reason if response.candidates else "No candidates."
-            safety_info = response.prompt_feedback if hasattr(response, 'prompt_feedback') else "No feedback available."
-            raise Exception(f"Gemini API returned no text content. Finish reason: {candidate_info}. Safety feedback: {safety_info}")
+            raise Exception(f"Gemini API returned no text content. Finish reason: {candidate_info}. Safety feedback: {response.prompt_feedback}")
 
     except Exception as e:
         raise Exception(f"Gemini API call/processing failed for '{input_text[:60]}...': {str(e)}")
@@ -85,13 +132,12 @@ if __name__ == "__main__":
              print("\nERROR: Input text cannot be empty.")
              sys.exit(1)
 
-        # --- Split Input into Sentences using NLTK ---
-        print("\nTokenizing input into sentences...")
-        english_sentences = sent_tokenize(english_input_block)
-        english_sentences = [s.strip() for s in english_sentences if s.strip()] # Clean up list
+        # --- Split Input into Sentences ---
+        print("\nSplitting input into sentences...")
+        english_sentences = split_into_sentences(english_input_block)
 
         if not english_sentences:
-            print("\nERROR: NLTK could not detect any sentences, or input was empty after stripping.")
+            print("\nERROR: no sentences detected, or input was empty after stripping.")
             sys.exit(1)
 
         # --- Call the API for Each Sentence and Print Results ---
@@ -123,9 +169,6 @@ if __name__ == "__main__":
         print("Translation process finished.")
         print("="*40)
 
-    except FileNotFoundError:
-         print("\nERROR: NLTK data path not found. Ensure NLTK is installed and 'punkt' is downloaded.")
-         sys.exit(1)
     except Exception as e:
         print(f"\nAn unexpected overall error occurred: {e}")
         sys.exit(1)
@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError, wait
+from typing import Callable, Dict, Optional
+
+from .ollama_api import DeadlineExceeded
+
+# --- Hedged requests ---
+# The primary backend gets a head start equal to a percentile of its recent
+# latency. If it has not answered by then, the same work is sent to a backup
+# backend and whichever answers first wins. Calls run on a bounded pool; when
+# hung primaries have taken every worker, the primary runs inline in the
+# caller's thread and the hedge is skipped rather than queued behind them.
+
+class Hedger:
+    def __init__(self, percentile: float = 95, fallback_delay: float = 2.0, window: int = 200, min_samples: int = 20,
+                 max_workers: int = 16):
+        self.percentile = percentile
+        self.fallback_delay = fallback_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='translation-hedge')
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._counts = {'requests': 0, 'hedged': 0, 'primary_wins': 0, 'hedge_wins': 0, 'failures': 0,
+                        'saturated': 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def _submit(self, fn: Callable[[], str]) -> Optional[Future]:
+        """Runs fn on a free worker, or returns None if every worker is busy."""
+        if not self._slots.acquire(blocking=False):
+            return None
+        future = self._executor.submit(fn)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def delay(self) -> float:
+        """
+        Seconds to wait for the primary before hedging: the configured percentile
+        of recent primary latencies, or fallback_delay until enough samples exist.
+        """
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.fallback_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return samples[index]
+
+    def call(self, primary: Callable[[threading.Event], str], backup: Callable[[], str]) -> str:
+        """
+        Runs primary(cancel_event); after delay() also runs backup().
+        Returns the first successful result and sets cancel_event if the backup won.
+        """
+        self._count('requests')
+        cancel_event = threading.Event()
+
+        def timed_primary():
+            start = time.monotonic()
+            result = primary(cancel_event)
+            if not cancel_event.is_set():
+                with self._lock:
+                    self._latencies.append(time.monotonic() - start)
+            return result
+
+        primary_future = self._submit(timed_primary)
+        if primary_future is None:
+            self._count('saturated')
+            try:
+                result = timed_primary()
+            except Exception:
+                self._count('failures')
+                raise
+            self._count('primary_wins')
+            return result
+        try:
+            result = primary_future.result(timeout=self.delay())
+            self._count('primary_wins')
+            return result
+        except TimeoutError:
+            pass
+        except DeadlineExceeded:
+            # The budget is spent; a backup could only finish late
+            self._count('failures')
+            raise
+        except Exception:
+            # The primary failed outright before the hedge point; the backup is still worth a try
+            pass
+
+        futures = {}
+        backup_future = self._submit(backup)
+        if backup_future is not None:
+            self._count('hedged')
+            futures[backup_future] = 'hedge_wins'
+        elif primary_future.done():
+            # The primary already failed and no worker is free: the backup runs in this thread
+            self._count('saturated')
+            try:
+                result = backup()
+            except Exception:
+                self._count('failures')
+                raise
+            self._count('hedge_wins')
+            return result
+        else:
+            # No worker for the hedge: keep waiting on the primary alone
+            self._count('saturated')
+        last_error = None
+        if primary_future.done() and primary_future.exception() is not None:
+            last_error = primary_future.exception()
+        else:
+            futures[primary_future] = 'primary_wins'
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                winner = futures.pop(future)
+                if future.exception() is not None:
+                    last_error = future.exception()
+                    continue
+                # Tell the losing Ollama stream to hang up; a losing Gemini call is just ignored
+                cancel_event.set()
+                self._count(winner)
+                return future.result()
+        self._count('failures')
+        raise last_error
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = dict(self._counts)
+            samples = len(self._latencies)
+        counts['hedge_rate'] = round(counts['hedged'] / counts['requests'], 3) if counts['requests'] else 0.0
+        counts['latency_samples'] = samples
+        counts['hedge_delay_seconds'] = round(self.delay(), 3)
+        return counts
@@ -0,0 +1,118 @@
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import TranslationHistory
+
+# --- Write-behind translation history ---
+# Requests only append an unsaved TranslationHistory row to an in-memory
+# buffer. A background thread writes the buffer with one bulk_create once
+# `batch_size` rows are waiting or `flush_interval` seconds after the first
+# row arrived, so the translation path never waits on an INSERT. Rows still
+# buffered when the process dies are lost; history is best-effort.
+
+class HistoryBuffer:
+    def __init__(self, batch_size: int = 50, flush_interval: float = 0.5, max_pending: int = 5000,
+                 autostart: bool = True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.autostart = autostart
+        self._pending = deque(maxlen=max_pending)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._counts = {'recorded': 0, 'flushed': 0, 'dropped': 0, 'failed': 0}
+
+    def record(self, row: TranslationHistory) -> None:
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                # The database is not keeping up; shed the oldest row rather than grow without bound
+                self._counts['dropped'] += 1
+            self._pending.append(row)
+            self._counts['recorded'] += 1
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+            if self.autostart and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='translation-history', daemon=True)
+                self._thread.start()
+
+    def flush(self) -> int:
+        """Writes everything buffered so far. Returns the number of rows written."""
+        with self._cond:
+            rows: List[TranslationHistory] = list(self._pending)
+            self._pending.clear()
+        if not rows:
+            return 0
+        try:
+            TranslationHistory.objects.bulk_create(rows, batch_size=self.batch_size)
+            written = len(rows)
+        except Exception:
+            logging.exception("Could not write %d translation history rows as a batch; retrying one by one", len(rows))
+            written = self._write_one_by_one(rows)
+        with self._cond:
+            self._counts['flushed'] += written
+            self._counts['failed'] += len(rows) - written
+        return written
+
+    def _write_one_by_one(self, rows: List[TranslationHistory]) -> int:
+        """Fallback after a failed batch, so one bad row (e.g. a deleted user) only loses itself."""
+        written = 0
+        for row in rows:
+            try:
+                TranslationHistory.objects.bulk_create([row])
+                written += 1
+            except Exception:
+                logging.warning("Dropping translation history row for user %s", row.user_id, exc_info=True)
+        return written
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                flush_at = time.monotonic() + self.flush_interval
+                while len(self._pending) < self.batch_size:
+                    remaining = flush_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            close_old_connections()
+            self.flush()
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            return {'pending': len(self._pending), **self._counts}
+
+HISTORY_BUFFER = HistoryBuffer(
+    batch_size=settings.TRANSLATION_HISTORY_BATCH_SIZE,
+    flush_interval=settings.TRANSLATION_HISTORY_FLUSH_MS / 1000,
+    max_pending=settings.TRANSLATION_HISTORY_MAX_PENDING,
+)
+atexit.register(HISTORY_BUFFER.flush)
+
+def record_translation(user, text: str, model: str, sentences: List[Dict], latency: float, error: bool = False) -> None:
+    """Buffers one history row for a finished translation request."""
+    if not settings.TRANSLATION_HISTORY_ENABLED or user.pk is None or user._state.adding:
+        # Unsaved users (e.g. the benchmark's) have no row to attach history to
+        return
+    backends = {s['backend'] for s in sentences if s['backend']}
+    if error:
+        row_status = 'error'
+    else:
+        row_status = 'ok' if all(s['status'] == 'ok' for s in sentences) else 'partial'
+    HISTORY_BUFFER.record(TranslationHistory(
+        user_id=user.id,
+        input_hash=hashlib.sha256(text.encode()).hexdigest(),
+        text=text,
+        gloss='\n'.join(s['gloss'] for s in sentences if s['gloss']),
+        backend=backends.pop() if len(backends) == 1 else ('mixed' if backends else ''),
+        model=model,
+        latency_ms=int(latency * 1000),
+        status=row_status,
+    ))
@@ -0,0 +1,86 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TranslationJob, TranslationJobSentence, UserAPIKey
+from .pipeline import get_hedge_caller, translate_sentences
+from .sentences import split_into_sentences
+
+# --- Background translation jobs ---
+# Jobs and their sentences live in the database, so no broker is needed: the
+# web process runs them on a small thread pool, and `manage.py
+# run_translation_jobs` picks up anything left queued (e.g. after a restart).
+
+_executor = ThreadPoolExecutor(max_workers=settings.TRANSLATION_JOB_WORKERS, thread_name_prefix='translation-job')
+
+def submit_job(user, text: str, model: str, options: Optional[Dict] = None, api_key: Optional[str] = None) -> TranslationJob:
+    """
+    Stores the job with one row per sentence and queues it on the worker pool.
+    A client-supplied api_key is only held in memory, never stored with the job.
+    """
+    texts = split_into_sentences(text)
+    with transaction.atomic():
+        job = TranslationJob.objects.create(
+            user=user, model=model, options=options or {}, total_sentences=len(texts)
+        )
+        TranslationJobSentence.objects.bulk_create([
+            TranslationJobSentence(job=job, index=index, text=sentence)
+            for index, sentence in enumerate(texts)
+        ])
+        transaction.on_commit(lambda: _executor.submit(_run_in_worker, job.id, api_key))
+    return job
+
+def _run_in_worker(job_id: int, api_key: Optional[str]) -> None:
+    try:
+        run_job(job_id, api_key)
+    finally:
+        # Worker threads get their own connection; don't leak it
+        connection.close()
+
+def run_job(job_id: int, api_key: Optional[str] = None) -> None:
+    """
+    Translates the job's pending sentences chunk by chunk, saving each chunk as it finishes
+    so pollers see partial output. Does nothing if another worker already claimed the job.
+    """
+    claimed = TranslationJob.objects.filter(id=job_id, status='queued').update(
+        status='running', updated_at=timezone.now()
+    )
+    if not claimed:
+        return
+
+    job = TranslationJob.objects.select_related('user').get(id=job_id)
+    try:
+        if job.model == 'gemini-pro' and not api_key:
+            user_api_key = UserAPIKey.objects.filter(user=job.user).first()
+            if not user_api_key or not user_api_key.has_key:
+                raise Exception('No Gemini API key found for user.')
+            api_key = user_api_key.gemini_api_key
+        sentence_caller = get_hedge_caller(job.user, job.options) if job.model == 'local' else None
+
+        pending = list(job.sentences.filter(status='pending'))
+        chunk_size = settings.TRANSLATION_JOB_CHUNK_SIZE
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            results = translate_sentences(
+                [row.text for row in chunk], job.model, api_key=api_key, options=job.options,
+                sentence_caller=sentence_caller, user_key=job.user_id, interactive=False
+            )
+            for row, result in zip(chunk, results):
+                row.gloss = result['gloss']
+                row.backend = result['backend']
+                row.status = result['status']
+            with transaction.atomic():
+                TranslationJobSentence.objects.bulk_update(chunk, ['gloss', 'backend', 'status'])
+                TranslationJob.objects.filter(id=job_id).update(
+                    completed_sentences=F('completed_sentences') + len(chunk), updated_at=timezone.now()
+                )
+
+        TranslationJob.objects.filter(id=job_id).update(status='completed', updated_at=timezone.now())
+    except Exception as e:
+        logging.exception("Translation job %s failed", job_id)
+        TranslationJob.objects.filter(id=job_id).update(status='failed', error=str(e), updated_at=timezone.now())
@@ -0,0 +1,60 @@
+import json
+import statistics
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from translation.ollama_api import OLLAMA_URL, build_generate_payload, wait_for_ollama
+
+SAMPLE_SENTENCES = [
+    "The red car is fast.",
+    "Have you eaten breakfast?",
+    "I will visit my grandmother next week.",
+    "My brother does not like spicy food.",
+    "Where is the nearest hospital?",
+]
+
+class Command(BaseCommand):
+    help = 'Compare Ollama prompt-eval time for the legacy full prompt against the cached system prompt.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default='mistral', help='Model ID or Ollama model name')
+        parser.add_argument('--runs', type=int, default=3, help='Passes over the sample sentences per mode')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def _measure(self, model, use_system_prompt, runs):
+        # The first call loads the model and fills the cache; it is not counted
+        self._generate(build_generate_payload(SAMPLE_SENTENCES[0], model, use_system_prompt))
+        tokens, durations = [], []
+        for _ in range(runs):
+            for sentence in SAMPLE_SENTENCES:
+                result = self._generate(build_generate_payload(sentence, model, use_system_prompt))
+                tokens.append(result.get('prompt_eval_count', 0))
+                durations.append(result.get('prompt_eval_duration', 0) / 1e6)
+        return {
+            'requests': len(durations),
+            'mean_prompt_tokens': round(statistics.mean(tokens), 1),
+            'mean_prompt_eval_ms': round(statistics.mean(durations), 2),
+            'p95_prompt_eval_ms': round(sorted(durations)[int(len(durations) * 0.95) - 1], 2),
+        }
+
+    def _generate(self, payload):
+        response = requests.post(f"{OLLAMA_URL}/api/generate", json=payload, timeout=120)
+        if response.status_code != 200:
+            raise CommandError(f"Ollama returned status code {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def handle(self, *args, **options):
+        if not wait_for_ollama():
+            raise CommandError(f'Could not connect to Ollama at {OLLAMA_URL}')
+        results = {
+            'full_prompt': self._measure(options['model'], False, options['runs']),
+            'system_prompt': self._measure(options['model'], True, options['runs']),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, stats in results.items():
+            self.stdout.write(
+                f"{mode:<14} tokens/request: {stats['mean_prompt_tokens']:>7}  "
+                f"prompt eval mean: {stats['mean_prompt_eval_ms']:>8} ms  p95: {stats['p95_prompt_eval_ms']:>8} ms"
+            )
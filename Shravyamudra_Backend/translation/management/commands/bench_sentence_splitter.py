@@ -0,0 +1,20 @@
+import json
+
+from django.core.management.base import BaseCommand
+from translation.benchmark import run_splitter_benchmark
+
+class Command(BaseCommand):
+    help = 'Time split_into_sentences on the splitter test corpus and a long document, and print a JSON report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per input')
+        parser.add_argument('--copies', type=int, default=200, help='Copies of the corpus in the long document')
+        parser.add_argument('--output', help='Also write the report to this file')
+
+    def handle(self, *args, **options):
+        report = run_splitter_benchmark(repeat=max(1, options['repeat']), document_copies=max(1, options['copies']))
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
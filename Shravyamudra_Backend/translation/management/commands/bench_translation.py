@@ -0,0 +1,49 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from translation.benchmark import MockOllamaServer, run_benchmark
+
+class Command(BaseCommand):
+    help = 'Load-test the translation endpoint against a mock Ollama server and print a JSON report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8], help='Concurrency levels to run')
+        parser.add_argument('--requests', type=int, default=40, help='Requests per concurrency level')
+        parser.add_argument('--sentences', type=int, default=1, help='Sentences per request')
+        parser.add_argument('--latency', default='lognormal:-2.3:0.5',
+                            help='Mock generate latency: fixed:S, uniform:LO:HI or lognormal:MU:SIGMA (seconds)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of generate calls that return HTTP 500')
+        parser.add_argument('--model', default='mistral', help='Model ID sent as options.ollama_model')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for latency and error sampling')
+        parser.add_argument('--rate-limit', action='store_true', help='Keep the per-user token bucket on')
+        parser.add_argument('--rules-first', action='store_true', help='Let the rule tier answer confident sentences')
+        parser.add_argument('--memory', action='store_true', help='Let the translation memory answer repeats')
+        parser.add_argument('--output', help='Also write the report to this file')
+
+    def _commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def handle(self, *args, **options):
+        try:
+            server = MockOllamaServer(latency=options['latency'], error_rate=options['error_rate'], seed=options['seed'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        with server:
+            report = run_benchmark(
+                server, options['concurrency'], requests_per_level=options['requests'],
+                sentences_per_request=options['sentences'], model=options['model'],
+                options={'rules_first': options['rules_first'], 'memory': options['memory']},
+                rate_limited=options['rate_limit'],
+            )
+        report['commit'] = self._commit()
+        report['config']['latency'] = options['latency']
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
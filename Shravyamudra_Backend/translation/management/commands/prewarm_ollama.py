@@ -0,0 +1,26 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from translation.ollama_api import OLLAMA_KEEP_ALIVE, OLLAMA_URL, prewarm_model, wait_for_ollama
+
+class Command(BaseCommand):
+    help = 'Load the configured Ollama models into memory so the first translation does not pay a cold start.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--models', nargs='+', help='Models to load (defaults to OLLAMA_PREWARM_MODELS)')
+        parser.add_argument('--keep-alive', default=OLLAMA_KEEP_ALIVE, help='How long Ollama should keep the models loaded')
+
+    def handle(self, *args, **options):
+        models = options['models'] or settings.OLLAMA_PREWARM_MODELS
+        if not wait_for_ollama():
+            raise CommandError(f'Could not connect to Ollama at {OLLAMA_URL}')
+        failed = []
+        for model in models:
+            start = time.time()
+            if prewarm_model(model, keep_alive=options['keep_alive']):
+                self.stdout.write(self.style.SUCCESS(f'Loaded {model} in {time.time() - start:.1f}s'))
+            else:
+                failed.append(model)
+                self.stdout.write(self.style.ERROR(f'Failed to load {model}'))
+        if failed:
+            raise CommandError(f"Could not prewarm: {', '.join(failed)}")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from translation.jobs import run_job
+from translation.models import TranslationJob
+
+class Command(BaseCommand):
+    help = 'Run queued translation jobs (e.g. ones left behind by a restarted web process).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+        parser.add_argument('--requeue-running', action='store_true',
+                            help='Requeue jobs stuck in "running" (only safe when no other worker is active)')
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            count = TranslationJob.objects.filter(status='running').update(status='queued')
+            self.stdout.write(self.style.WARNING(f'Requeued {count} running jobs'))
+        while True:
+            job_ids = list(TranslationJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True))
+            for job_id in job_ids:
+                run_job(job_id)
+                job = TranslationJob.objects.get(id=job_id)
+                style = self.style.SUCCESS if job.status == 'completed' else self.style.ERROR
+                self.stdout.write(style(f'Job {job_id}: {job.status} ({job.completed_sentences}/{job.total_sentences})'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,147 @@
+import math
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+
+# --- Fuzzy translation memory ---
+# Remembers LLM glosses for past sentences and reuses them for exact and
+# near repeats ("My name is Ravi" -> "My name is Priya"). Candidates come from
+# a word inverted index; the best one is scored with a token-level diff.
+# A near match is only reused when every difference is either a word the
+# gloss drops anyway (articles, copulas) or a slot (name or number) that can
+# be swapped in the stored gloss. Once full, the least recently used entry
+# (added or matched) is evicted.
+
+TOKEN_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?|\d+(?:[.,]\d+)*|\?")
+
+# Words that never appear in the gloss, so adding or removing them keeps it valid
+IGNORABLE = {'a', 'an', 'the', 'is', 'am', 'are', 'was', 'were'}
+
+MAX_CANDIDATES = 10
+
+def _tokens(sentence: str) -> Tuple[List[str], List[str]]:
+    """Returns (lowercased tokens, original-case tokens)."""
+    original = TOKEN_RE.findall(sentence)
+    return [t.lower() for t in original], original
+
+def _is_slot(token: str, position: int) -> bool:
+    """Names (capitalised, not sentence-initial) and numbers can be substituted safely."""
+    return token[0].isdigit() or (position > 0 and token[0].isupper())
+
+class TranslationMemory:
+    def __init__(self, capacity: int = 10000, min_similarity: float = 0.75):
+        self.capacity = capacity
+        self.min_similarity = min_similarity
+        self._entries = OrderedDict()  # entry id -> (tokens, original tokens, gloss), least recently used first
+        self._exact = {}  # normalised sentence -> entry id
+        self._index: Dict[str, Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, sentence: str, gloss: str) -> None:
+        tokens, original = _tokens(sentence)
+        if not tokens or not gloss:
+            return
+        key = ' '.join(tokens)
+        with self._lock:
+            if key in self._exact:
+                self._remove(self._exact[key])
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (tokens, original, gloss)
+            self._exact[key] = entry_id
+            for token in set(tokens):
+                self._index.setdefault(token, set()).add(entry_id)
+            while len(self._entries) > self.capacity:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int) -> None:
+        tokens, _, _ = self._entries.pop(entry_id)
+        self._exact.pop(' '.join(tokens), None)
+        for token in set(tokens):
+            ids = self._index.get(token)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._index[token]
+
+    def lookup(self, sentence: str) -> Optional[Tuple[str, float]]:
+        """
+        Returns (gloss, similarity) for an exact or safely adaptable near match, else None.
+        """
+        tokens, original = _tokens(sentence)
+        if not tokens:
+            return None
+        with self._lock:
+            entry_id = self._exact.get(' '.join(tokens))
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                return self._entries[entry_id][2], 1.0
+
+            # Prefix filtering: a match needs at least `required` of the query's distinct
+            # tokens, so it must contain one of the (len - required + 1) rarest ones
+            distinct = sorted(set(tokens), key=lambda t: len(self._index.get(t, ())))
+            required = max(1, math.ceil(self.min_similarity * len(tokens) / (2 - self.min_similarity))
+                           - (len(tokens) - len(distinct)))
+            candidate_ids = set()
+            for token in distinct[:max(1, len(distinct) - required + 1)]:
+                candidate_ids.update(self._index.get(token, ()))
+
+            scored = []
+            query_set = set(distinct)
+            for candidate in candidate_ids:
+                stored_tokens, stored_original, gloss = self._entries[candidate]
+                # Length filter: the diff ratio can never exceed 2 * shorter / total
+                if 2 * min(len(stored_tokens), len(tokens)) < self.min_similarity * (len(stored_tokens) + len(tokens)):
+                    continue
+                scored.append((len(query_set.intersection(stored_tokens)), candidate))
+            scored.sort(reverse=True)
+            candidates = [(c, self._entries[c]) for _, c in scored[:MAX_CANDIDATES]]
+
+        best, best_id = None, None
+        for candidate, (stored_tokens, stored_original, gloss) in candidates:
+            similarity = SequenceMatcher(None, stored_tokens, tokens, autojunk=False).ratio()
+            if similarity < self.min_similarity or (best and similarity <= best[1]):
+                continue
+            adapted = self._adapt(stored_tokens, stored_original, gloss, tokens, original)
+            if adapted is not None:
+                best, best_id = (adapted, round(similarity, 2)), candidate
+        if best_id is not None:
+            with self._lock:
+                if best_id in self._entries:
+                    self._entries.move_to_end(best_id)
+        return best
+
+    def _adapt(self, stored_tokens, stored_original, gloss, tokens, original) -> Optional[str]:
+        """Rewrites the stored gloss for the query, or returns None if that isn't safe."""
+        gloss_signs = gloss.split()
+        matcher = SequenceMatcher(None, stored_tokens, tokens, autojunk=False)
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == 'equal':
+                continue
+            if op in ('delete', 'insert'):
+                changed = stored_tokens[i1:i2] if op == 'delete' else tokens[j1:j2]
+                if not all(t in IGNORABLE for t in changed):
+                    return None
+                continue
+            # 'replace': only one-for-one slot swaps are safe
+            if i2 - i1 != j2 - j1:
+                return None
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                old, new = stored_original[i], original[j]
+                if old.lower() in IGNORABLE and new.lower() in IGNORABLE:
+                    continue
+                if not (_is_slot(old, i) and _is_slot(new, j)):
+                    return None
+                # Names may be glossed whole (RAVI) or fingerspelled (R-A-V-I)
+                forms = {old.upper(): new.upper(), '-'.join(old.upper()): '-'.join(new.upper())}
+                positions = [k for k, sign in enumerate(gloss_signs) if sign in forms]
+                if len(positions) != 1:
+                    return None
+                gloss_signs[positions[0]] = forms[gloss_signs[positions[0]]]
+        return ' '.join(gloss_signs)
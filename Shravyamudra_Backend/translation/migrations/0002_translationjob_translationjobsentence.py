@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-19 11:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translation', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('options', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('total_sentences', models.PositiveIntegerField(default=0)),
+                ('completed_sentences', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='translation_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TranslationJobSentence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('gloss', models.TextField(blank=True)),
+                ('backend', models.CharField(blank=True, max_length=20)),
+                ('status', models.CharField(default='pending', help_text='pending, ok, error or deadline_exceeded', max_length=20)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sentences', to='translation.translationjob')),
+            ],
+            options={
+                'ordering': ['index'],
+                'unique_together': {('job', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-19 11:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translation', '0002_translationjob_translationjobsentence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_hash', models.CharField(help_text='SHA-256 of the input text', max_length=64)),
+                ('text', models.TextField()),
+                ('gloss', models.TextField(blank=True)),
+                ('backend', models.CharField(blank=True, help_text="Backend that produced the gloss, or 'mixed'", max_length=20)),
+                ('model', models.CharField(max_length=20)),
+                ('latency_ms', models.PositiveIntegerField()),
+                ('status', models.CharField(help_text='ok, partial or error', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='translation_history', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Translation history',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='translation_history_user_idx')],
+            },
+        ),
+    ]
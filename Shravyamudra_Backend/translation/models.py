@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class UserAPIKey(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='api_key')
@@ -11,3 +12,62 @@ class UserAPIKey(models.Model):
     @property
     def has_key(self):
         return bool(self.gemini_api_key)
+
+class TranslationJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='translation_jobs')
+    model = models.CharField(max_length=20)
+    options = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total_sentences = models.PositiveIntegerField(default=0)
+    completed_sentences = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Translation job {self.id} for {self.user.username} ({self.status})"
+
+class TranslationJobSentence(models.Model):
+    job = models.ForeignKey(TranslationJob, on_delete=models.CASCADE, related_name='sentences')
+    index = models.PositiveIntegerField()
+    text = models.TextField()
+    gloss = models.TextField(blank=True)
+    backend = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=20, default='pending', help_text="pending, ok, error or deadline_exceeded")
+
+    class Meta:
+        unique_together = ('job', 'index')
+        ordering = ['index']
+
+    def __str__(self):
+        return f"Sentence {self.index} of job {self.job_id}"
+
+class TranslationHistory(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='translation_history')
+    input_hash = models.CharField(max_length=64, help_text="SHA-256 of the input text")
+    text = models.TextField()
+    gloss = models.TextField(blank=True)
+    backend = models.CharField(max_length=20, blank=True, help_text="Backend that produced the gloss, or 'mixed'")
+    model = models.CharField(max_length=20)
+    latency_ms = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, help_text="ok, partial or error")
+    # Set when the request finishes, not when the write-behind buffer flushes
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', '-created_at'], name='translation_history_user_idx')]
+        verbose_name_plural = 'Translation history'
+
+    def __str__(self):
+        return f"Translation by {self.user.username} at {self.created_at}"
@@ -1,11 +1,25 @@
 import requests
 import json
+import logging
+import os
+import threading
 import time
 import re
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict
 
-# --- ISL Prompt Template (Same as Gemini for consistent results) ---
-ISL_PROMPT_TEMPLATE = '''You are an expert in Indian Sign Language (ISL) translation. Your task is to translate English text into grammatically correct ISL gloss, focusing on natural and fluent sign language expression. Follow these ISL grammar principles strictly:
+from .sentences import split_into_sentences
+
+# Base URL of the Ollama server
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434').rstrip('/')
+
+# How long Ollama keeps a model loaded after a request (e.g. "30m", "1h", "-1" for forever)
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+
+# Context window; constant across requests so Ollama never reloads the model to resize it
+OLLAMA_NUM_CTX = int(os.getenv('OLLAMA_NUM_CTX', '2048'))
+
+# --- ISL Prompt (Same rules as Gemini for consistent results) ---
+ISL_RULES = '''You are an expert in Indian Sign Language (ISL) translation. Your task is to translate English text into grammatically correct ISL gloss, focusing on natural and fluent sign language expression. Follow these ISL grammar principles strictly:
 
 **Rules:**
 1.  **Structure:** Topic-Comment. Order: TIME-PLACE-PERSON-OBJECT-VERB.
@@ -25,7 +39,19 @@ ISL Gloss: "BREAKFAST EAT FINISH YOU ?"
 
 English: "The red car is fast"
 ISL Gloss: "CAR RED FAST"
+'''
+
+# Static instructions, sent once per call as the Ollama system prompt so the
+# tokenized prefix is identical for every sentence and reused from the KV cache
+ISL_SYSTEM_PROMPT = ISL_RULES + '''
+Translate each English sentence you are given into grammatically correct ISL gloss, applying these rules consistently. Provide ONLY the ISL gloss translation, no explanations.'''
 
+# The only part of the prompt that changes between sentences
+ISL_SENTENCE_TEMPLATE = '''English: "{input_text}"
+ISL Gloss:'''
+
+# Single-prompt form used before the system prompt split (kept for prompt-eval benchmarks)
+ISL_PROMPT_TEMPLATE = ISL_RULES + '''
 Now translate the following English text into grammatically correct ISL gloss, applying these rules consistently. Provide ONLY the ISL gloss translation, no explanations:
 
 """
@@ -33,6 +59,20 @@ Now translate the following English text into grammatically correct ISL gloss, a
 """
 '''
 
+GENERATION_OPTIONS = {
+    "temperature": 0.1,    # Low temperature for consistent output
+    "top_p": 0.7,
+    "top_k": 20,
+    "num_ctx": OLLAMA_NUM_CTX,
+    "repeat_penalty": 1.2,
+    "stop": ['"""', '\nEnglish:', 'Explanation', 'Note', 'Definition', 'In ISL'],
+    "num_predict": 200     # Upper bound; per-sentence calls use estimate_num_predict
+}
+
+# Bounds for the input-length-derived generation limit
+MIN_NUM_PREDICT = 16
+MAX_NUM_PREDICT = 200
+
 def get_model_name(model_id: str) -> str:
     """
     Maps the frontend model ID to the actual Ollama model name.
@@ -46,30 +86,63 @@ def get_model_name(model_id: str) -> str:
     }
     return model_mapping.get(model_id, model_id)
 
-def wait_for_ollama(timeout: int = 30) -> bool:
+def build_generate_payload(sentence: str, model_name: str, use_system_prompt: bool = True) -> Dict:
+    """
+    Builds the /api/generate request body for one sentence.
+    With use_system_prompt=False the legacy single prompt is sent instead.
+    """
+    payload = {
+        "model": get_model_name(model_name),
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": GENERATION_OPTIONS,
+    }
+    if use_system_prompt:
+        payload["system"] = ISL_SYSTEM_PROMPT
+        payload["prompt"] = ISL_SENTENCE_TEMPLATE.format(input_text=sentence)
+    else:
+        payload["prompt"] = ISL_PROMPT_TEMPLATE.format(input_text=sentence)
+    return payload
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's time budget runs out before Ollama could answer."""
+
+# Attempts with less than this many seconds of budget left are skipped rather than started
+MIN_ATTEMPT_SECONDS = 1.0
+
+def time_left(deadline: Optional[float]) -> float:
     """
-    Wait for Ollama service to be ready.
+    Seconds until a time.monotonic() deadline; infinite when there is no deadline.
+    """
+    return float('inf') if deadline is None else deadline - time.monotonic()
+
+def wait_for_ollama(timeout: int = 30, deadline: Optional[float] = None) -> bool:
+    """
+    Wait for Ollama service to be ready, for at most `timeout` seconds or until the deadline.
     Returns True if service is ready, False if timeout reached.
     """
-    start_time = time.time()
-    while time.time() - start_time < timeout:
+    end_time = time.monotonic() + min(timeout, time_left(deadline))
+    while time.monotonic() < end_time:
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
+            response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=min(5, end_time - time.monotonic()))
             if response.status_code == 200:
                 return True
         except:
             pass
-        time.sleep(1)
+        time.sleep(min(1, max(end_time - time.monotonic(), 0)))
     return False
 
-def check_model_availability(model_name: str, max_retries: int = 3) -> tuple[bool, Optional[str]]:
+def check_model_availability(model_name: str, max_retries: int = 3, deadline: Optional[float] = None) -> tuple[bool, Optional[str]]:
     """
     Checks if the specified model is available in Ollama.
     Returns (is_available, error_message)
     """
     for _ in range(max_retries):
+        remaining = time_left(deadline)
+        if remaining <= 0:
+            raise DeadlineExceeded("Deadline reached while checking model availability")
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
+            response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=min(5, remaining))
             if response.status_code == 200:
                 models = response.json().get("models", [])
                 if any(model["name"] == model_name for model in models):
@@ -77,140 +150,229 @@ def check_model_availability(model_name: str, max_retries: int = 3) -> tuple[boo
                 return False, f"Model '{model_name}' not found. Please run 'ollama pull {model_name}' first."
             return False, f"Ollama returned status code {response.status_code}"
         except requests.exceptions.ConnectionError:
-            time.sleep(1)
+            time.sleep(min(1, max(time_left(deadline), 0)))
+            continue
+        except requests.exceptions.Timeout:
             continue
         except Exception as e:
             return False, str(e)
     return False, "Could not connect to Ollama after multiple attempts"
 
-# --- Sentence Splitting Function (Same as in gemini_api.py) ---
-def split_into_sentences(text: str) -> List[str]:
+def prewarm_model(model_name: str, keep_alive: str = OLLAMA_KEEP_ALIVE, timeout: int = 120) -> bool:
     """
-    Splits text into sentences based on common punctuation (.?!) followed by space or end of line.
-    Handles basic cases but might not be perfect for complex text (e.g., abbreviations).
+    Loads the model into Ollama memory without generating anything.
+    A generate request with no prompt only loads the model and refreshes its keep_alive.
     """
-    # Regex: Looks for sentence-ending punctuation (.?!) followed by whitespace (\s) or end of string ($)
-    # The (?<=...) is a lookbehind assertion to keep the punctuation with the sentence.
-    sentences = re.split(r'(?<=[.?!])\s+', text)
-    # Filter out any empty strings that might result from splitting
-    return [s.strip() for s in sentences if s and s.strip()]
+    try:
+        response = requests.post(
+            f"{OLLAMA_URL}/api/generate",
+            json={
+                "model": get_model_name(model_name),
+                "keep_alive": keep_alive,
+                "options": {"num_ctx": OLLAMA_NUM_CTX},
+            },
+            timeout=timeout
+        )
+        return response.status_code == 200
+    except requests.exceptions.RequestException:
+        return False
 
-def call_ollama_for_sentence(sentence: str, model_name: str, max_retries: int = 3) -> str:
+def start_keep_warm(model_names: List[str], interval: int = 0, hours: tuple[int, int] = (0, 24)) -> threading.Thread:
     """
-    Calls the Ollama API for a single sentence with the ISL translation prompt template.
+    Starts a daemon thread that prewarms the models once, then pings them every
+    `interval` seconds while the local hour is within [start, end).
+    An interval of 0 only prewarms.
     """
-    actual_model = get_model_name(model_name)
-    prompt = ISL_PROMPT_TEMPLATE.format(input_text=sentence)
+    def ping_all():
+        for model_name in model_names:
+            if not prewarm_model(model_name):
+                logging.warning("Prewarm failed for Ollama model '%s'", model_name)
+
+    def keep_warm():
+        ping_all()
+        while interval > 0:
+            time.sleep(interval)
+            if hours[0] <= time.localtime().tm_hour < hours[1]:
+                ping_all()
+
+    thread = threading.Thread(target=keep_warm, name="ollama-keep-warm", daemon=True)
+    thread.start()
+    return thread
+
+def estimate_num_predict(sentence: str) -> int:
+    """
+    Derives the generation limit from the input length. Gloss drops articles and
+    copulas so it has fewer signs than the English has words, but uppercase
+    signs tokenize into more pieces, so allow ~3 tokens per input word.
+    """
+    return min(MAX_NUM_PREDICT, MIN_NUM_PREDICT + 3 * len(sentence.split()))
+
+def clean_gloss_line(line: str) -> Optional[str]:
+    """
+    Cleans one line of model output. Returns None for lines that are not gloss
+    (blank lines, explanations, list markers).
+    """
+    line = line.strip()
+    if not line:
+        return None
+    # Skip lines that look like explanations
+    if re.match(r'^(Here is|This is|In ISL|Translated)', line, re.IGNORECASE):
+        return None
+    # Skip lines with common markers
+    if line.startswith('*') or line.startswith('-') or line.startswith('>'):
+        return None
+    # Drop a leading label echoed from the few-shot examples
+    line = re.sub(r'^ISL Gloss:\s*', '', line, flags=re.IGNORECASE)
+    # Remove markdown formatting
+    line = re.sub(r'[*"`\'()]', '', line).strip()
+    if not line:
+        return None
+    # Ensure output is in uppercase for consistency with Gemini output
+    # If the model didn't provide uppercase, convert it
+    if not re.match(r'^[A-Z\s+\-]+$', line):
+        line = line.upper()
+    return line
+
+def _backoff(attempt: int, max_retries: int, deadline: Optional[float], last_error: str) -> None:
+    """
+    Sleeps before the next retry, or raises DeadlineExceeded when the retry could not finish in time.
+    Returns at once after the last attempt, which has nothing to wait for.
+    """
+    if attempt + 1 >= max_retries:
+        return
+    delay = 2 ** attempt  # Exponential backoff
+    if time_left(deadline) - delay < MIN_ATTEMPT_SECONDS:
+        raise DeadlineExceeded(f"Not enough time left to retry. Last error: {last_error}")
+    time.sleep(min(delay, max(time_left(deadline), 0)))
+
+def call_ollama_for_sentence(sentence: str, model_name: str, max_retries: int = 3, deadline: Optional[float] = None,
+                             cancel_event: Optional[threading.Event] = None) -> str:
+    """
+    Calls the Ollama API for a single sentence, sending the ISL rules as the system prompt.
+    The response is streamed and cleaned line by line; generation is cancelled as
+    soon as the first complete gloss line arrives.
+    Raises DeadlineExceeded when an attempt cannot start or finish before `deadline`
+    (a time.monotonic() value). Returns an empty string once `cancel_event` is set.
+    """
+    payload = build_generate_payload(sentence, model_name)
+    payload["stream"] = True
+    payload["options"] = dict(payload["options"], num_predict=estimate_num_predict(sentence))
     
     # Try to make the API call with retries
     last_error = None
     for attempt in range(max_retries):
+        remaining = time_left(deadline)
+        if remaining < MIN_ATTEMPT_SECONDS:
+            raise DeadlineExceeded(f"Deadline reached after {attempt} attempts. Last error: {last_error}")
         try:
-            response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": actual_model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,    # Low temperature for consistent output
-                        "top_p": 0.7,
-                        "top_k": 20,
-                        "num_ctx": 1024,
-                        "repeat_penalty": 1.2,
-                        "stop": ['"""', 'Explanation', 'Note', 'Definition', 'In ISL'],
-                        "num_predict": 200     # Increased to allow longer translations
-                    }
-                },
-                timeout=60
-            )
-            
-            if response.status_code != 200:
-                error_msg = "Unknown error"
-                try:
-                    error_data = response.json()
-                    error_msg = error_data.get("error", "Unknown error")
-                except:
-                    pass
-                raise Exception(f"Ollama API returned status code {response.status_code}: {error_msg}")
-            
-            result = response.json()
-            raw_translation = result["response"].strip()
-            
-            # Clean up the response - simpler processing than before
-            # Remove explanatory text and keep only the actual translation
-            lines = raw_translation.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                # Skip lines that look like explanations
-                if re.match(r'^(Here is|This is|In ISL|Translated)', line, re.IGNORECASE):
-                    continue
-                # Skip lines with common markers
-                if line.startswith('*') or line.startswith('-') or line.startswith('>'):
-                    continue
-                # Remove markdown formatting
-                line = re.sub(r'[*"`\'()]', '', line)
-                cleaned_lines.append(line)
-            
-            joined_text = ' '.join(cleaned_lines)
-            
-            # Ensure output is in uppercase for consistency with Gemini output
-            # If the model didn't provide uppercase, convert it
-            if not re.match(r'^[A-Z\s+\-]+$', joined_text):
-                joined_text = joined_text.upper()
-            
-            return joined_text.strip()
+            # Closing the response early drops the connection, which makes Ollama stop generating
+            with requests.post(
+                f"{OLLAMA_URL}/api/generate",
+                json=payload,
+                stream=True,
+                timeout=min(60, remaining)
+            ) as response:
+                if response.status_code != 200:
+                    error_msg = "Unknown error"
+                    try:
+                        error_data = response.json()
+                        error_msg = error_data.get("error", "Unknown error")
+                    except:
+                        pass
+                    raise Exception(f"Ollama API returned status code {response.status_code}: {error_msg}")
+
+                buffer = ""
+                for chunk in response.iter_lines():
+                    if not chunk:
+                        continue
+                    result = json.loads(chunk)
+                    buffer += result.get("response", "")
+                    # Check every completed line; the last piece may still be growing
+                    *complete_lines, buffer = buffer.split('\n')
+                    for line in complete_lines:
+                        gloss = clean_gloss_line(line)
+                        if gloss:
+                            return gloss
+                    if result.get("done"):
+                        break
+                    if time_left(deadline) <= 0:
+                        raise DeadlineExceeded("Deadline reached while generating")
+                    if cancel_event is not None and cancel_event.is_set():
+                        return ""
+
+                return clean_gloss_line(buffer) or ""
                 
         except requests.exceptions.ConnectionError:
             last_error = "Connection error"
-            time.sleep(2 ** attempt)  # Exponential backoff
+            _backoff(attempt, max_retries, deadline, last_error)
             continue
         except requests.exceptions.Timeout:
             last_error = "Request timed out"
-            time.sleep(2 ** attempt)
+            _backoff(attempt, max_retries, deadline, last_error)
             continue
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             raise Exception(f"Ollama API call failed: {str(e)}")
     
     raise Exception(f"Failed after {max_retries} attempts. Last error: {last_error}")
 
-def call_ollama_api(input_text: str, model_name: str = "gemma", max_retries: int = 3) -> str:
+def call_ollama_for_sentences(sentences: List[str], model_name: str = "gemma", max_retries: int = 3,
+                              deadline: Optional[float] = None,
+                              sentence_caller: Callable[..., str] = None) -> List[tuple[str, str]]:
     """
-    Processes text, splits into sentences, and translates each one using Ollama.
-    This mirrors the Gemini implementation for consistent results.
+    Checks that Ollama and the model are ready, then translates each sentence individually.
+    Returns one (ISL gloss, status) pair per input sentence; status is "ok", "error"
+    or "deadline_exceeded" for sentences the time budget did not cover.
+    `sentence_caller` replaces call_ollama_for_sentence (e.g. to hedge each call).
     """
+    sentence_caller = sentence_caller or call_ollama_for_sentence
+    skipped = [("[TRANSLATION SKIPPED]", "deadline_exceeded")] * len(sentences)
+
     # First ensure Ollama is running
-    if not wait_for_ollama():
+    if not wait_for_ollama(deadline=deadline):
+        if time_left(deadline) <= 0:
+            return skipped
         raise Exception(
             "Could not connect to Ollama. Please ensure:\n"
             "1. Ollama is installed and running (run 'ollama serve' in a terminal)\n"
-            "2. The service is accessible at localhost:11434"
+            f"2. The service is accessible at {OLLAMA_URL}"
         )
     
     # Then check model availability
     actual_model = get_model_name(model_name)
-    model_available, error_msg = check_model_availability(actual_model)
+    try:
+        model_available, error_msg = check_model_availability(actual_model, deadline=deadline)
+    except DeadlineExceeded:
+        return skipped
     if not model_available:
         raise Exception(error_msg)
     
-    # Split input text into sentences for more accurate translation
-    sentences = split_into_sentences(input_text)
-    if not sentences:
-        return ""  # No valid sentences to translate
-    
     # Process each sentence individually
     translations = []
-    for sentence in sentences:
+    for index, sentence in enumerate(sentences):
         try:
-            isl_translation = call_ollama_for_sentence(sentence, model_name, max_retries)
-            translations.append(isl_translation)
+            isl_translation = sentence_caller(sentence, model_name, max_retries, deadline=deadline)
+            translations.append((isl_translation, "ok"))
+        except DeadlineExceeded as e:
+            # Nothing after this sentence can finish in time either
+            logging.warning("Deadline reached translating sentence '%s': %s", sentence, e)
+            return translations + skipped[index:]
         except Exception as e:
             # Log the error but continue with other sentences
-            print(f"Error translating sentence '{sentence}': {str(e)}")
-            translations.append(f"[TRANSLATION ERROR]")
+            logging.warning("Error translating sentence '%s': %s", sentence, e)
+            translations.append((f"[TRANSLATION ERROR]", "error"))
+    return translations
+
+def call_ollama_api(input_text: str, model_name: str = "gemma", max_retries: int = 3) -> str:
+    """
+    Processes text, splits into sentences, and translates each one using Ollama.
+    This mirrors the Gemini implementation for consistent results.
+    """
+    # Split input text into sentences for more accurate translation
+    sentences = split_into_sentences(input_text)
+    if not sentences:
+        return ""  # No valid sentences to translate
     
     # Join all translations with appropriate separator
-    return '\n'.join(translations) 
\ No newline at end of file
+    return '\n'.join(gloss for gloss, _ in call_ollama_for_sentences(sentences, model_name, max_retries))
@@ -0,0 +1,142 @@
+import logging
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .gemini_api import call_gemini_api
+from .hedging import Hedger
+from .memory import TranslationMemory
+from .models import UserAPIKey
+from .ollama_api import MIN_ATTEMPT_SECONDS, DeadlineExceeded, call_ollama_for_sentence, call_ollama_for_sentences, time_left
+from .rules_api import call_rules_api
+from .scheduler import FairScheduler
+
+# --- Sentence translation pipeline ---
+# Shared by the synchronous TranslationAPIView and the background job workers:
+# the rule tier first, then Gemini or Ollama for whatever it could not handle.
+
+MODELS = ('gemini-pro', 'local', 'rules')
+
+# Shared across requests so the hedge delay tracks recent Ollama latency
+OLLAMA_GEMINI_HEDGER = Hedger(
+    percentile=settings.TRANSLATION_HEDGE_PERCENTILE,
+    fallback_delay=settings.TRANSLATION_HEDGE_FALLBACK_DELAY_SECONDS,
+    max_workers=settings.TRANSLATION_HEDGE_MAX_WORKERS,
+)
+
+# Past LLM glosses, reused for exact and near-repeat sentences
+TRANSLATION_MEMORY = TranslationMemory(
+    capacity=settings.TRANSLATION_MEMORY_SIZE,
+    min_similarity=settings.TRANSLATION_MEMORY_MIN_SIMILARITY,
+)
+
+# Admission control for the single local Ollama box
+OLLAMA_SCHEDULER = FairScheduler(
+    max_concurrency=settings.TRANSLATION_LLM_MAX_CONCURRENCY,
+    max_queue=settings.TRANSLATION_LLM_MAX_QUEUE,
+    rate=settings.TRANSLATION_USER_RATE,
+    burst=settings.TRANSLATION_USER_BURST,
+)
+
+def get_hedge_caller(user, options: Dict):
+    """
+    Returns a sentence caller that hedges Ollama with Gemini, or None when the
+    client did not opt in or the user has no stored Gemini key.
+    """
+    if not (settings.TRANSLATION_HEDGING_ENABLED and options.get('hedge')):
+        return None
+    user_api_key = UserAPIKey.objects.filter(user=user).first()
+    if not user_api_key or not user_api_key.has_key:
+        return None
+    gemini_key = user_api_key.gemini_api_key
+
+    def hedged_call(sentence, model_name, max_retries, deadline=None):
+        def backup():
+            if deadline is None:
+                return call_gemini_api(gemini_key, sentence, timeout=None)
+            remaining = time_left(deadline)
+            if remaining <= 0:
+                raise DeadlineExceeded("Deadline reached before the Gemini hedge could start")
+            return call_gemini_api(gemini_key, sentence, timeout=remaining)
+
+        return OLLAMA_GEMINI_HEDGER.call(
+            lambda cancel_event: call_ollama_for_sentence(
+                sentence, model_name, max_retries, deadline=deadline, cancel_event=cancel_event
+            ),
+            backup,
+        )
+    return hedged_call
+
+def translate_sentences(texts: List[str], model: str, api_key: Optional[str] = None, options: Optional[Dict] = None,
+                        deadline: Optional[float] = None, sentence_caller=None, user_key=None,
+                        interactive: bool = True) -> List[Dict]:
+    """
+    Translates already-split sentences with the requested model.
+    Returns one dict per sentence with text, gloss, backend, confidence and status
+    ("ok", "error" or "deadline_exceeded").
+    Ollama calls go through OLLAMA_SCHEDULER under `user_key`; interactive callers are
+    rate limited and wait at most TRANSLATION_LLM_MAX_WAIT_SECONDS, background jobs wait
+    as long as needed.
+    Raises when the backend is unusable (e.g. Ollama not running, Gemini never answering)
+    and SchedulerSaturated when an interactive caller is not admitted.
+    """
+    options = options or {}
+    sentences = [
+        {'text': text, 'gloss': None, 'backend': None, 'confidence': None, 'status': None}
+        for text in texts
+    ]
+
+    # Rule-based first tier: confident glosses never reach an LLM
+    use_rules = model == 'rules' or (
+        settings.TRANSLATION_RULES_FIRST_TIER and options.get('rules_first', True)
+    )
+    if use_rules:
+        rule_results = call_rules_api([s['text'] for s in sentences])
+        for sentence, (gloss, confidence) in zip(sentences, rule_results):
+            if model == 'rules' or confidence >= settings.TRANSLATION_RULES_MIN_CONFIDENCE:
+                sentence.update(gloss=gloss, backend='rules', confidence=confidence, status='ok')
+
+    # Translation memory: exact and near repeats of earlier LLM translations
+    use_memory = model != 'rules' and settings.TRANSLATION_MEMORY_ENABLED and options.get('memory', True)
+    if use_memory:
+        for sentence in sentences:
+            if sentence['gloss'] is None:
+                match = TRANSLATION_MEMORY.lookup(sentence['text'])
+                if match:
+                    sentence.update(gloss=match[0], backend='memory', confidence=match[1], status='ok')
+
+    pending = [s for s in sentences if s['gloss'] is None]
+    if pending and model == 'gemini-pro':
+        last_error = None
+        for sentence in pending:
+            remaining = time_left(deadline)
+            if remaining < MIN_ATTEMPT_SECONDS:
+                sentence.update(gloss='[TRANSLATION SKIPPED]', backend=model, status='deadline_exceeded')
+                continue
+            try:
+                gloss = call_gemini_api(api_key, sentence['text'], timeout=None if deadline is None else remaining)
+                sentence.update(gloss=gloss, backend=model, status='ok')
+            except Exception as e:
+                logging.warning("Gemini translation failed for one sentence: %s", e)
+                last_error = e
+                sentence.update(gloss='[TRANSLATION ERROR]', backend=model, status='error')
+        # Keep the previous behaviour of failing the request when Gemini never answered
+        if last_error and not any(s['status'] == 'ok' for s in pending):
+            raise last_error
+    elif pending:
+        # Use Ollama for local model
+        max_wait = min(settings.TRANSLATION_LLM_MAX_WAIT_SECONDS, time_left(deadline)) if interactive else None
+        with OLLAMA_SCHEDULER.slot(user_key, cost=len(pending), max_wait=max_wait, rate_limited=interactive):
+            results = call_ollama_for_sentences(
+                [s['text'] for s in pending], model_name=options.get('ollama_model', 'mistral'),
+                deadline=deadline, sentence_caller=sentence_caller
+            )
+        for sentence, (gloss, status) in zip(pending, results):
+            sentence.update(gloss=gloss, backend=model, status=status)
+
+    if use_memory:
+        for sentence in pending:
+            if sentence['status'] == 'ok':
+                TRANSLATION_MEMORY.add(sentence['text'], sentence['gloss'])
+
+    return sentences
@@ -0,0 +1,284 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# --- Deterministic ISL gloss rules ---
+# Applies the rules from ollama_api.ISL_PROMPT_TEMPLATE directly for short,
+# simple sentences. Every sentence gets a confidence score in [0, 1]; callers
+# escalate to an LLM when the score is below their threshold.
+
+MAX_WORDS = 12
+
+TOKEN_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?|\d+(?:[.,]\d+)*|[?!.,;:\"()]")
+
+ARTICLES = {'a', 'an', 'the'}
+COPULAS = {'is', 'am', 'are', 'was', 'were', 'be', 'been', 'being'}
+DO_AUX = {'do', 'does', 'did'}
+HAVE_AUX = {'have', 'has', 'had'}
+FUTURE = {'will', 'shall'}
+MODALS = {'can', 'could', 'should', 'would', 'must', 'may', 'might'}
+UNCERTAIN_MODALS = {'could', 'would', 'might', 'may'}
+DROPPED_PREPOSITIONS = {'to', 'at', 'in', 'on', 'of', 'into', 'onto', 'for'}
+# Particles that make a phrasal verb (SIT DOWN, TURN OFF); 'in' only counts at the end of the sentence
+PARTICLES = {'up', 'down', 'off', 'out', 'in'}
+NEGATIONS = {'not': 'NOT', 'never': 'NEVER'}
+QUESTION_WORDS = {'what', 'where', 'when', 'who', 'whom', 'whose', 'why', 'how', 'which'}
+CLAUSE_WORDS = {'and', 'but', 'or', 'because', 'if', 'although', 'though', 'while',
+                'than', 'unless', 'since', 'so', 'that', 'which', 'whether'}
+
+TIME_WORDS = {'today', 'tomorrow', 'yesterday', 'now', 'tonight', 'later', 'soon', 'daily'}
+TIME_MODIFIERS = {'last', 'next', 'this', 'every'}
+TIME_NOUNS = {'morning', 'afternoon', 'evening', 'night', 'day', 'week', 'weekend',
+              'month', 'year', 'monday', 'tuesday', 'wednesday', 'thursday',
+              'friday', 'saturday', 'sunday'}
+
+ADJECTIVES = {
+    'red', 'blue', 'green', 'yellow', 'black', 'white', 'orange', 'pink', 'purple', 'brown',
+    'big', 'small', 'large', 'little', 'tall', 'short', 'long', 'hot', 'cold', 'warm',
+    'new', 'old', 'young', 'good', 'bad', 'happy', 'sad', 'beautiful', 'fast', 'slow',
+    'easy', 'difficult', 'hard', 'important', 'hungry', 'thirsty', 'tired', 'sick',
+    'angry', 'clean', 'dirty', 'rich', 'poor', 'heavy', 'light', 'deaf', 'kind', 'nice',
+    'busy', 'free', 'cheap', 'expensive', 'full', 'empty', 'favourite', 'favorite',
+}
+
+# Base verbs whose regular inflections are generated below.
+BASE_VERBS = {
+    'eat', 'drink', 'like', 'love', 'want', 'need', 'know', 'live', 'work', 'study',
+    'play', 'help', 'learn', 'sign', 'talk', 'watch', 'cook', 'walk', 'open', 'close',
+    'wash', 'start', 'stop', 'wait', 'call', 'visit', 'dance', 'use', 'ask',
+    'answer', 'finish', 'try', 'cry', 'laugh', 'jump', 'move', 'look', 'listen', 'pray',
+    'travel', 'enjoy', 'hate', 'miss', 'shop', 'drive', 'read', 'write', 'go', 'come',
+    'see', 'sleep', 'teach', 'speak', 'understand', 'buy', 'give', 'take', 'make',
+    'meet', 'run', 'sit', 'stand', 'swim', 'sing', 'bring', 'think', 'forget', 'tell',
+    'get', 'have', 'feel', 'find', 'pay', 'sell', 'send', 'leave', 'lose', 'win',
+    'begin', 'hear', 'keep', 'draw', 'fly', 'break', 'choose', 'wear',
+}
+
+IRREGULAR_FORMS = {
+    'ate': 'eat', 'eaten': 'eat', 'drank': 'drink', 'drunk': 'drink', 'went': 'go',
+    'gone': 'go', 'came': 'come', 'saw': 'see', 'seen': 'see', 'slept': 'sleep',
+    'taught': 'teach', 'spoke': 'speak', 'spoken': 'speak', 'understood': 'understand',
+    'bought': 'buy', 'gave': 'give', 'given': 'give', 'took': 'take', 'taken': 'take',
+    'made': 'make', 'met': 'meet', 'ran': 'run', 'sat': 'sit', 'stood': 'stand',
+    'swam': 'swim', 'sang': 'sing', 'sung': 'sing', 'brought': 'bring', 'thought': 'think',
+    'forgot': 'forget', 'forgotten': 'forget', 'told': 'tell', 'got': 'get',
+    'gotten': 'get', 'felt': 'feel', 'found': 'find', 'paid': 'pay', 'sold': 'sell',
+    'sent': 'send', 'left': 'leave', 'lost': 'lose', 'won': 'win', 'began': 'begin',
+    'begun': 'begin', 'heard': 'hear', 'kept': 'keep', 'drew': 'draw', 'drawn': 'draw',
+    'flew': 'fly', 'flown': 'fly', 'broke': 'break', 'broken': 'break', 'chose': 'choose',
+    'chosen': 'choose', 'wore': 'wear', 'worn': 'wear', 'wrote': 'write',
+    'written': 'write', 'drove': 'drive', 'driven': 'drive', 'knew': 'know',
+    'known': 'know', 'read': 'read', 'had': 'have', 'has': 'have',
+}
+
+PRONOUNS = {'i', 'me', 'you', 'he', 'him', 'she', 'her', 'it', 'we', 'us', 'they', 'them'}
+
+CONTRACTIONS = {
+    "won't": ['will', 'not'], "can't": ['can', 'not'], "shan't": ['shall', 'not'],
+    "i'm": ['i', 'am'], "let's": ['we'],
+}
+SUFFIX_CONTRACTIONS = {"'re": 'are', "'ll": 'will', "'ve": 'have', "'d": 'would', "'m": 'am'}
+IS_CONTRACTION_HOSTS = {'it', 'he', 'she', 'that', 'what', 'where', 'who', 'how', 'there', 'here', 'this'}
+
+
+def _inflect(base: str) -> Dict[str, str]:
+    """Returns the regular inflected forms of a base verb mapped to their kind."""
+    forms = {base: 'base'}
+    if base.endswith(('s', 'sh', 'ch', 'x', 'o')):
+        forms[base + 'es'] = 'base'
+    elif base.endswith('y') and base[-2] not in 'aeiou':
+        forms[base[:-1] + 'ies'] = 'base'
+    else:
+        forms[base + 's'] = 'base'
+
+    if base.endswith('e') and not base.endswith('ee'):
+        stem_ing, stem_ed = base[:-1], base[:-1]
+    elif base.endswith('y') and base[-2] not in 'aeiou':
+        stem_ing, stem_ed = base, base[:-1] + 'i'
+    elif (len(base) <= 4 and base[-1] not in 'aeiouwxy'
+          and base[-2] in 'aeiou' and base[-3:-2] not in ('', 'a', 'e', 'i', 'o', 'u')):
+        stem_ing = stem_ed = base + base[-1]
+    else:
+        stem_ing, stem_ed = base, base
+    forms[stem_ing + 'ing'] = 'ing'
+    forms[stem_ed + 'ed'] = 'past'
+    return forms
+
+
+def _build_verb_forms() -> Dict[str, Tuple[str, str]]:
+    verb_forms = {}
+    for base in BASE_VERBS:
+        for form, kind in _inflect(base).items():
+            verb_forms.setdefault(form, (base, kind))
+    for form, base in IRREGULAR_FORMS.items():
+        if form not in BASE_VERBS:
+            verb_forms[form] = (base, 'past')
+    verb_forms['has'] = ('have', 'base')
+    return verb_forms
+
+
+VERB_FORMS = _build_verb_forms()
+
+
+def _expand(word: str) -> List[str]:
+    """Splits contractions and possessives into plain words."""
+    if word in CONTRACTIONS:
+        return list(CONTRACTIONS[word])
+    if word.endswith("n't"):
+        return [word[:-3], 'not']
+    for suffix, expansion in SUFFIX_CONTRACTIONS.items():
+        if word.endswith(suffix):
+            return [word[:-len(suffix)], expansion]
+    if word.endswith("'s"):
+        host = word[:-2]
+        return [host, 'is'] if host in IS_CONTRACTION_HOSTS else [host]
+    return [word]
+
+
+def _tokenize(sentence: str) -> Tuple[List[str], List[str]]:
+    words, punctuation = [], []
+    for token in TOKEN_RE.findall(sentence):
+        if token[0].isalnum():
+            words.extend(w for w in _expand(token.lower()) if w)
+        else:
+            punctuation.append(token)
+    return words, punctuation
+
+
+def _is_noun(word: Optional[str]) -> bool:
+    return bool(word) and word not in ADJECTIVES and word not in VERB_FORMS \
+        and word not in PRONOUNS and not word.isdigit()
+
+
+def _participle_follows(words: List[str], index: int) -> bool:
+    """True when the auxiliary at index is followed by a past participle (HAVE YOU EATEN)."""
+    for word in words[index + 1:index + 4]:
+        if word in PRONOUNS or word in NEGATIONS:
+            continue
+        return VERB_FORMS.get(word, ('', ''))[1] == 'past'
+    return False
+
+
+def _adjectives_after_nouns(words: List[str]) -> List[str]:
+    """Moves runs of adjectives after the noun they modify (RED CAR -> CAR RED)."""
+    result, adjectives = [], []
+    for word in words:
+        if word in ADJECTIVES:
+            adjectives.append(word)
+            continue
+        if adjectives and _is_noun(word):
+            result.append(word)
+            result.extend(adjectives)
+        else:
+            result.extend(adjectives)
+            result.append(word)
+        adjectives = []
+    result.extend(adjectives)
+    return result
+
+
+def translate_sentence(sentence: str) -> Tuple[str, float]:
+    """
+    Applies the ISL gloss rules to a single sentence.
+    Returns (gloss, confidence); confidence is 0.0 when the sentence is out of scope.
+    """
+    words, punctuation = _tokenize(sentence)
+    if not words or len(words) > MAX_WORDS:
+        return '', 0.0
+
+    confidence = 1.0
+    is_question = '?' in punctuation
+    if any(p in punctuation for p in (',', ';', ':', '"', '(', ')')):
+        confidence -= 0.4
+    if any(w in CLAUSE_WORDS for w in words):
+        confidence -= 0.5
+
+    time_signs, wh_signs, negation, modals = [], [], [], []
+    subject, obj, verbs = [], [], []
+    aspect = None
+    future = False
+    saw_copula = False
+    i = 0
+    while i < len(words):
+        word = words[i]
+        following = words[i + 1] if i + 1 < len(words) else None
+        if word in PARTICLES and i and words[i - 1] in VERB_FORMS and (word != 'in' or following is None):
+            confidence -= 0.3  # Phrasal verbs are signed as one unit the rules do not know
+
+        if word in TIME_MODIFIERS and following in TIME_NOUNS:
+            time_signs.extend([word, following])
+            i += 2
+            continue
+        if word in TIME_WORDS or (word in TIME_NOUNS and not verbs and not subject and not obj):
+            time_signs.append(word)
+        elif word in ARTICLES or word in DROPPED_PREPOSITIONS:
+            pass
+        elif word in COPULAS:
+            saw_copula = True
+        elif word in DO_AUX and (following in PRONOUNS or following in NEGATIONS or following in VERB_FORMS):
+            if word == 'did':
+                aspect = 'FINISH'
+        elif word in HAVE_AUX and _participle_follows(words, i):
+            aspect = 'FINISH'
+        elif word in FUTURE:
+            future = True
+        elif word in MODALS:
+            modals.append(word)
+            if word in UNCERTAIN_MODALS:
+                confidence -= 0.2
+        elif word in NEGATIONS:
+            negation.append(NEGATIONS[word])
+        elif word in QUESTION_WORDS:
+            if not is_question or i > 1:
+                confidence -= 0.5
+            wh_signs.append(word)
+        elif word in VERB_FORMS:
+            base, kind = VERB_FORMS[word]
+            if kind == 'ing':
+                aspect = 'CONTINUE'
+            elif kind == 'past':
+                if saw_copula and aspect is None:
+                    confidence -= 0.3  # Passive voice
+                aspect = 'FINISH'
+            if word in HAVE_AUX:
+                confidence -= 0.3  # Possessive HAVE
+            verbs.append(base)
+        else:
+            if word.endswith(('ed', 'ing')) and word not in ADJECTIVES:
+                # Probably an out-of-lexicon verb; enough on its own to fall through to the LLM
+                confidence -= 0.3
+            elif word.endswith('ly') and word not in ADJECTIVES:
+                confidence -= 0.2
+            (obj if verbs else subject).append(word)
+        i += 1
+
+    if len(verbs) > 1:
+        confidence -= 0.3
+    if negation and aspect:
+        confidence -= 0.3  # Where NOT goes relative to FINISH/CONTINUE is not settled by the rules
+    if not verbs and not saw_copula and len(subject) > 2:
+        confidence -= 0.3  # Probably an out-of-lexicon verb
+
+    gloss = list(time_signs)
+    if future:
+        gloss.append('will')
+    gloss.extend(_adjectives_after_nouns(subject))
+    gloss.extend(_adjectives_after_nouns(obj))
+    gloss.extend(verbs)
+    if aspect and gloss[-1:] != [aspect.lower()]:
+        gloss.append(aspect)
+    gloss.extend(modals)
+    gloss.extend(negation)
+    gloss.extend(wh_signs)
+    if not gloss:
+        return '', 0.0
+    if is_question:
+        gloss.append('?')
+
+    return ' '.join(g.upper() for g in gloss), round(max(confidence, 0.0), 2)
+
+
+def call_rules_api(sentences: List[str]) -> List[Tuple[str, float]]:
+    """
+    Translates each sentence with the rule engine. Returns (gloss, confidence) pairs.
+    """
+    return [translate_sentence(sentence) for sentence in sentences]
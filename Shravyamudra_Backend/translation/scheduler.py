@@ -0,0 +1,155 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Hashable, Optional
+
+# --- Fair admission in front of the local LLM ---
+# At most `max_concurrency` callers hold a slot at once. Waiting callers are
+# queued per user and slots are handed out round-robin across users, so one
+# user with many requests cannot starve everyone else. Each user also has a
+# token bucket; interactive requests that exceed it are rejected up front, and
+# get their tokens back if they are then turned away for lack of a slot.
+
+# Longest Retry-After ever reported (e.g. when the refill rate is 0)
+MAX_RETRY_AFTER = 3600
+# Buckets that have refilled completely are forgotten at most this often
+BUCKET_SWEEP_SECONDS = 60
+
+class SchedulerSaturated(Exception):
+    """Raised when a caller is rate limited or could not get a slot in time."""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(min(retry_after, MAX_RETRY_AFTER)))
+
+class FairScheduler:
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 50, rate: float = 0.2, burst: float = 20):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.rate = rate
+        self.burst = burst
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queues = OrderedDict()  # user key -> deque of tickets, in round-robin order
+        self._granted = set()
+        self._buckets = {}  # user key -> (tokens, last refill time); absent means a full bucket
+        self._last_sweep = time.monotonic()
+        self._waits = deque(maxlen=500)
+        self._holds = deque(maxlen=500)
+        self._counts = {'admitted': 0, 'rate_limited': 0, 'queue_full': 0, 'timed_out': 0}
+
+    def _take_tokens(self, key: Hashable, cost: float) -> float:
+        """
+        Charges the user's bucket. Returns 0 on success, otherwise the seconds until enough tokens exist.
+        Requests larger than the burst are charged the full burst so they can still run.
+        """
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / self.rate if self.rate > 0 else MAX_RETRY_AFTER
+        self._buckets[key] = (tokens - cost, now)
+        self._sweep_buckets(now)
+        return 0.0
+
+    def _refund_tokens(self, key: Hashable, cost: float) -> None:
+        """Gives back tokens charged to a request that was then not admitted."""
+        cost = min(cost, self.burst)
+        tokens, last = self._buckets.get(key, (self.burst, time.monotonic()))
+        self._buckets[key] = (min(self.burst, tokens + cost), last)
+
+    def _sweep_buckets(self, now: float) -> None:
+        """Forgets buckets that have refilled to the burst, so idle users take no memory."""
+        if now - self._last_sweep < BUCKET_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+        for key, (tokens, last) in list(self._buckets.items()):
+            if tokens + (now - last) * self.rate >= self.burst:
+                del self._buckets[key]
+
+    def _queue_depth(self) -> int:
+        return sum(len(tickets) for tickets in self._queues.values())
+
+    def _estimated_wait(self) -> float:
+        mean_hold = sum(self._holds) / len(self._holds) if self._holds else 1.0
+        return (self._queue_depth() + 1) * mean_hold / self.max_concurrency
+
+    def _dispatch(self) -> None:
+        """Hands free slots to the next user in round-robin order. Caller holds the lock."""
+        while self._active < self.max_concurrency and self._queues:
+            key, tickets = next(iter(self._queues.items()))
+            self._granted.add(tickets.popleft())
+            self._active += 1
+            if tickets:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+        self._cond.notify_all()
+
+    def _drop_ticket(self, key: Hashable, ticket: object) -> None:
+        tickets = self._queues.get(key)
+        if tickets is not None:
+            tickets.remove(ticket)
+            if not tickets:
+                del self._queues[key]
+
+    @contextmanager
+    def slot(self, key: Hashable, cost: float = 1, max_wait: Optional[float] = None, rate_limited: bool = True):
+        """
+        Holds one concurrency slot for the duration of the block.
+        Raises SchedulerSaturated when the user's bucket is empty, the queue is
+        full, or no slot frees up within max_wait seconds (None waits forever).
+        """
+        start = time.monotonic()
+        with self._cond:
+            if rate_limited:
+                retry_after = self._take_tokens(key, cost)
+                if retry_after:
+                    self._counts['rate_limited'] += 1
+                    raise SchedulerSaturated("Too many translation requests; please slow down.", retry_after)
+            if self._queue_depth() >= self.max_queue:
+                if rate_limited:
+                    self._refund_tokens(key, cost)
+                self._counts['queue_full'] += 1
+                raise SchedulerSaturated("Translation service is busy.", self._estimated_wait())
+
+            ticket = object()
+            self._queues.setdefault(key, deque()).append(ticket)
+            self._dispatch()
+            while ticket not in self._granted:
+                remaining = None if max_wait is None else start + max_wait - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._drop_ticket(key, ticket)
+                    if rate_limited:
+                        self._refund_tokens(key, cost)
+                    self._counts['timed_out'] += 1
+                    raise SchedulerSaturated("Translation service is busy.", self._estimated_wait())
+                self._cond.wait(remaining)
+            self._granted.discard(ticket)
+            self._counts['admitted'] += 1
+            self._waits.append(time.monotonic() - start)
+
+        acquired = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._holds.append(time.monotonic() - acquired)
+                self._active -= 1
+                self._dispatch()
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                'active': self._active,
+                'max_concurrency': self.max_concurrency,
+                'queue_depth': self._queue_depth(),
+                'users_waiting': len(self._queues),
+                'mean_wait_ms': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                'p95_wait_ms': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+                **self._counts,
+            }
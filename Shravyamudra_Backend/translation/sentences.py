@@ -0,0 +1,54 @@
+import re
+from typing import List
+
+# --- Sentence splitting ---
+# One splitter for every backend so Gemini, Ollama and the rule tier see the
+# same sentences. Candidate boundaries come from a single precompiled regex;
+# a boundary after a period is then rejected for abbreviations ("Dr. Rao"),
+# initials ("A. P. J. Kalam") and when the next word starts in lowercase.
+# Decimals ("3.5") never match because the period must be followed by space.
+
+# Candidate boundary: terminal punctuation, optional closing quotes/brackets, whitespace.
+# A blank line always ends a sentence.
+BOUNDARY_RE = re.compile(r'([.?!…]+)(["\'”’)\]]*)\s+|\n\s*\n')
+
+# Lowercase, without the trailing period
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'smt', 'shri', 'capt', 'col', 'gen', 'lt', 'sgt',
+    'e.g', 'i.e', 'vs', 'approx', 'fig', 'dept', 'govt', 'inc', 'ltd', 'co', 'corp', 'est',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+})
+
+def _is_boundary(text: str, match: re.Match) -> bool:
+    punctuation = match.group(1)
+    if punctuation is None:
+        return True
+    following = text[match.end():match.end() + 1]
+    if '?' in punctuation or '!' in punctuation:
+        return True
+    if following.islower() or following.isdigit():
+        return False
+    if punctuation != '.':
+        # Ellipsis: only a capitalised next word starts a new sentence
+        return following.isupper()
+    word_start = max(text.rfind(' ', 0, match.start()), text.rfind('\n', 0, match.start())) + 1
+    word = text[word_start:match.start()].lstrip('"\'(“‘[').lower()
+    if word in ABBREVIATIONS:
+        return False
+    # Single-letter initials, but not the pronoun ("So did I. Then...")
+    return not (len(word) == 1 and word.isalpha() and word != 'i')
+
+def split_into_sentences(text: str) -> List[str]:
+    """
+    Splits text into sentences, keeping terminal punctuation and closing quotes
+    with the sentence they end. Empty pieces are dropped.
+    """
+    sentences = []
+    start = 0
+    for match in BOUNDARY_RE.finditer(text):
+        if _is_boundary(text, match):
+            end = match.end(2) if match.group(1) is not None else match.start()
+            sentences.append(text[start:end].strip())
+            start = match.end()
+    sentences.append(text[start:].strip())
+    return [s for s in sentences if s]
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import UserAPIKey
+from .models import TranslationHistory, TranslationJob, TranslationJobSentence, UserAPIKey
 
 class UserAPIKeySerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,3 +9,25 @@ class UserAPIKeySerializer(serializers.ModelSerializer):
 
 class UserAPIKeySetSerializer(serializers.Serializer):
     api_key = serializers.CharField(write_only=True, min_length=10, max_length=128)
+
+class TranslationJobSentenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TranslationJobSentence
+        fields = ['index', 'text', 'gloss', 'backend', 'status']
+
+class TranslationJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TranslationJob
+        fields = ['id', 'model', 'status', 'total_sentences', 'completed_sentences', 'progress', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        return int(obj.completed_sentences / obj.total_sentences * 100) if obj.total_sentences else 100
+
+class TranslationHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TranslationHistory
+        fields = ['id', 'text', 'gloss', 'backend', 'model', 'latency_ms', 'status', 'created_at']
+        read_only_fields = fields
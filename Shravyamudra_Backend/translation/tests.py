@@ -1,3 +1,515 @@
-from django.test import TestCase
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from . import gemini_api, history, ollama_api, pipeline
+from .apps import is_serving
+from .hedging import Hedger
+from .benchmark import SPLITTER_CORPUS, MockOllamaServer, parse_latency, run_benchmark, run_splitter_benchmark
+from .jobs import run_job
+from .memory import TranslationMemory
+from .models import TranslationHistory, TranslationJob
+from .rules_api import translate_sentence
+from .scheduler import MAX_RETRY_AFTER, FairScheduler, SchedulerSaturated
+from .sentences import split_into_sentences
+
+User = get_user_model()
+
+class RuleGlossTest(SimpleTestCase):
+    def test_prompt_examples(self):
+        self.assertEqual(translate_sentence("The red car is fast"), ('CAR RED FAST', 1.0))
+        self.assertEqual(translate_sentence("Have you eaten breakfast?")[0], 'YOU BREAKFAST EAT FINISH ?')
+
+    def test_time_first_question_and_negation_last(self):
+        self.assertEqual(translate_sentence("I will go to school tomorrow.")[0], 'TOMORROW WILL I SCHOOL GO')
+        self.assertEqual(translate_sentence("Where do you live?")[0], 'YOU LIVE WHERE ?')
+        self.assertEqual(translate_sentence("I don't like coffee.")[0], 'I COFFEE LIKE NOT')
+
+    def test_complex_sentences_have_low_confidence(self):
+        _, confidence = translate_sentence("This book is more interesting than the one we read last month.")
+        self.assertLess(confidence, 0.8)
+        self.assertEqual(translate_sentence(" ".join(["word"] * 20)), ('', 0.0))
+
+    def test_unhandled_constructions_fall_below_threshold(self):
+        for sentence, gloss in (("Please sit down.", 'PLEASE DOWN SIT'),
+                                ("I am not feeling well.", 'I WELL FEEL CONTINUE NOT'),
+                                ("I have two cats.", 'I TWO CATS HAVE')):
+            with self.subTest(sentence=sentence):
+                result, confidence = translate_sentence(sentence)
+                self.assertEqual(result, gloss)
+                self.assertLess(confidence, 0.8)
+        self.assertEqual(translate_sentence("I live in Delhi."), ('I DELHI LIVE', 1.0))
+
+class TranslationRulesTierTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='translator', email='t@example.com', password='testpassword')
+        self.client.force_authenticate(self.user)
+
+    def test_rules_model(self):
+        response = self.client.post('/api/translation/translate/', {'text': 'The red car is fast.', 'model': 'rules'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['convertedText'], 'CAR RED FAST')
+        self.assertEqual(response.data['sentences'][0]['backend'], 'rules')
+
+    def test_only_unhandled_sentences_escalate(self):
+        text = 'The red car is fast. This book is more interesting than the one we read last month.'
+        with mock.patch('translation.pipeline.call_ollama_for_sentences', return_value=[('LLM GLOSS', 'ok')]) as ollama:
+            response = self.client.post('/api/translation/translate/', {'text': text, 'model': 'local'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ollama.call_args.args[0], ['This book is more interesting than the one we read last month.'])
+        self.assertEqual(response.data['convertedText'], 'CAR RED FAST\nLLM GLOSS')
+
+    def test_unknown_inflected_verb_escalates(self):
+        with mock.patch('translation.pipeline.call_ollama_for_sentences', return_value=[('RAIN NOW ?', 'ok')]) as ollama:
+            response = self.client.post('/api/translation/translate/', {'text': 'Is it raining?', 'model': 'local'}, format='json')
+        self.assertEqual(ollama.call_args.args[0], ['Is it raining?'])
+        self.assertEqual(response.data['sentences'][0]['backend'], 'local')
+
+class TranslationDeadlineTest(SimpleTestCase):
+    def test_retries_stop_when_budget_runs_out(self):
+        deadline = time.monotonic() + 1.5
+        with mock.patch.object(ollama_api.requests, 'post', side_effect=ollama_api.requests.exceptions.ConnectionError), \
+                mock.patch.object(ollama_api.time, 'sleep') as sleep:
+            with self.assertRaises(ollama_api.DeadlineExceeded):
+                ollama_api.call_ollama_for_sentence('The red car is fast', 'mistral', deadline=deadline)
+        # The 1s backoff after the first failure would leave less than MIN_ATTEMPT_SECONDS
+        sleep.assert_not_called()
+
+    def test_no_sleep_after_last_attempt(self):
+        with mock.patch.object(ollama_api.requests, 'post', side_effect=ollama_api.requests.exceptions.ConnectionError), \
+                mock.patch.object(ollama_api.time, 'sleep') as sleep:
+            with self.assertRaisesRegex(Exception, 'Failed after 3 attempts'):
+                ollama_api.call_ollama_for_sentence('The red car is fast', 'mistral')
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1, 2])
+
+    def test_remaining_sentences_skipped_after_deadline(self):
+        with mock.patch.object(ollama_api, 'wait_for_ollama', return_value=True), \
+                mock.patch.object(ollama_api, 'check_model_availability', return_value=(True, None)), \
+                mock.patch.object(ollama_api, 'call_ollama_for_sentence', side_effect=['A B', ollama_api.DeadlineExceeded()]):
+            results = ollama_api.call_ollama_for_sentences(['a', 'b', 'c'], 'mistral', deadline=time.monotonic() + 5)
+        self.assertEqual([status for _, status in results], ['ok', 'deadline_exceeded', 'deadline_exceeded'])
+
+class OllamaRequestTest(SimpleTestCase):
+    def test_generate_requests_keep_model_loaded(self):
+        reply = mock.MagicMock(status_code=200)
+        reply.__enter__.return_value = reply
+        reply.iter_lines.return_value = [b'{"response": "CAR RED FAST", "done": true}']
+        with mock.patch.object(ollama_api.requests, 'post', return_value=reply) as post:
+            self.assertEqual(ollama_api.call_ollama_for_sentence('The red car is fast', 'mistral'), 'CAR RED FAST')
+            self.assertTrue(ollama_api.prewarm_model('gemma'))
+        self.assertEqual(post.call_args_list[0].kwargs['json']['keep_alive'], ollama_api.OLLAMA_KEEP_ALIVE)
+        self.assertEqual(post.call_args_list[1].kwargs['json'], {
+            'model': 'gemma3:1b', 'keep_alive': ollama_api.OLLAMA_KEEP_ALIVE, 'options': {'num_ctx': ollama_api.OLLAMA_NUM_CTX},
+        })
+
+    def test_keep_warm_starts_only_when_serving(self):
+        cases = [
+            (['gunicorn', 'backend.wsgi'], '', True),
+            (['manage.py', 'migrate'], '', False),
+            (['manage.py', 'runserver'], '', False),
+            (['manage.py', 'runserver'], 'true', True),
+            (['manage.py', 'runserver', '--noreload'], '', True),
+        ]
+        for argv, run_main, expected in cases:
+            with mock.patch.object(sys, 'argv', argv), mock.patch.dict(os.environ, {'RUN_MAIN': run_main}):
+                self.assertEqual(is_serving(), expected, argv)
+
+    def test_static_instructions_sent_as_system_prompt(self):
+        payload = ollama_api.build_generate_payload('The red car is fast', 'mistral')
+        self.assertEqual(payload['system'], ollama_api.ISL_SYSTEM_PROMPT)
+        self.assertEqual(payload['prompt'], 'English: "The red car is fast"\nISL Gloss:')
+        legacy = ollama_api.build_generate_payload('The red car is fast', 'mistral', use_system_prompt=False)
+        self.assertNotIn('system', legacy)
+        self.assertIn(ollama_api.ISL_RULES, legacy['prompt'])
+
+    def test_stream_stops_at_first_gloss_line(self):
+        chunks = ['Here is the translation:\n', 'ISL Gloss: "car', ' red fast"\n', 'Explanation: adjectives follow nouns']
+        reply = mock.MagicMock(status_code=200)
+        reply.__enter__.return_value = reply
+        reply.iter_lines.return_value = iter(json.dumps({'response': c, 'done': False}).encode() for c in chunks)
+        with mock.patch.object(ollama_api.requests, 'post', return_value=reply) as post:
+            self.assertEqual(ollama_api.call_ollama_for_sentence('The red car is fast', 'mistral'), 'CAR RED FAST')
+        self.assertEqual(post.call_args.kwargs['json']['options']['num_predict'], ollama_api.estimate_num_predict('The red car is fast'))
+        # The explanation chunk was never read
+        self.assertEqual(len(list(reply.iter_lines.return_value)), 1)
+
+class HedgerTest(SimpleTestCase):
+    def test_fast_primary_is_not_hedged(self):
+        hedger = Hedger(fallback_delay=1.0)
+        backup = mock.Mock(return_value='GEMINI')
+        self.assertEqual(hedger.call(lambda cancel_event: 'OLLAMA', backup), 'OLLAMA')
+        backup.assert_not_called()
+        self.assertEqual(hedger.snapshot()['primary_wins'], 1)
+
+    def test_slow_primary_loses_to_hedge_and_is_cancelled(self):
+        hedger = Hedger(fallback_delay=0.01)
+        cancelled = threading.Event()
+
+        def slow_primary(cancel_event):
+            if cancel_event.wait(2):
+                cancelled.set()
+            return ''
+
+        self.assertEqual(hedger.call(slow_primary, lambda: 'GEMINI'), 'GEMINI')
+        self.assertTrue(cancelled.wait(2))
+        stats = hedger.snapshot()
+        self.assertEqual((stats['hedged'], stats['hedge_wins'], stats['hedge_rate']), (1, 1, 1.0))
+
+    def test_expired_deadline_is_not_hedged(self):
+        hedger = Hedger(fallback_delay=1.0)
+        backup = mock.Mock(return_value='GEMINI')
+
+        def expired_primary(cancel_event):
+            raise ollama_api.DeadlineExceeded()
+
+        with self.assertRaises(ollama_api.DeadlineExceeded):
+            hedger.call(expired_primary, backup)
+        backup.assert_not_called()
+
+    def test_saturated_pool_runs_primary_inline_without_hedge(self):
+        hedger = Hedger(fallback_delay=1.0, max_workers=1)
+        started, release = threading.Event(), threading.Event()
+
+        def hung_primary(cancel_event):
+            started.set()
+            release.wait(5)
+            return 'OLLAMA'
+
+        hung = threading.Thread(target=hedger.call, args=(hung_primary, lambda: 'GEMINI'))
+        hung.start()
+        self.assertTrue(started.wait(5))
+        backup = mock.Mock(return_value='GEMINI')
+        try:
+            # The hung call holds the only worker
+            self.assertEqual(hedger.call(lambda cancel_event: threading.current_thread().name, backup),
+                             threading.current_thread().name)
+        finally:
+            release.set()
+            hung.join(5)
+        backup.assert_not_called()
+        stats = hedger.snapshot()
+        self.assertEqual((stats['saturated'], stats['hedged'], stats['primary_wins']), (1, 0, 2))
+
+class TranslationJobTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='jobuser', email='job@example.com', password='testpassword')
+        self.client.force_authenticate(self.user)
+
+    def test_job_runs_and_reports_progress(self):
+        text = 'The red car is fast. Where do you live? I can swim.'
+        with mock.patch('translation.jobs._executor') as executor, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post('/api/translation/jobs/', {'text': text, 'model': 'rules'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(len(callbacks), 1)
+        job_id = response.data['jobId']
+        self.assertEqual(executor.submit.call_args.args[1:], (job_id, None))
+
+        poll = self.client.get(f'/api/translation/jobs/{job_id}/')
+        self.assertEqual((poll.data['status'], poll.data['sentences']), ('queued', []))
+
+        with self.settings(TRANSLATION_JOB_CHUNK_SIZE=2):
+            run_job(job_id)
+        poll = self.client.get(f'/api/translation/jobs/{job_id}/', {'since': 1})
+        self.assertEqual(poll.data['status'], 'completed')
+        self.assertEqual(poll.data['progress'], 100)
+        self.assertEqual(poll.data['convertedText'], 'YOU LIVE WHERE ?\nI SWIM CAN')
+
+    def test_other_users_jobs_are_hidden(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpassword')
+        job = TranslationJob.objects.create(user=other, model='rules')
+        self.assertEqual(self.client.get(f'/api/translation/jobs/{job.id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+class FairSchedulerTest(SimpleTestCase):
+    def test_slots_alternate_between_users(self):
+        scheduler = FairScheduler(max_concurrency=1, rate=100, burst=100)
+        order = []
+        release = threading.Event()
+
+        def hold_first_slot():
+            with scheduler.slot('heavy'):
+                release.wait(2)
+
+        def run(key, label):
+            with scheduler.slot(key):
+                order.append(label)
+
+        holder = threading.Thread(target=hold_first_slot)
+        holder.start()
+        waiters = []
+        for key, label in [('heavy', 'heavy-1'), ('heavy', 'heavy-2'), ('heavy', 'heavy-3'), ('light', 'light-1')]:
+            thread = threading.Thread(target=run, args=(key, label))
+            thread.start()
+            waiters.append(thread)
+            while scheduler.snapshot()['queue_depth'] < len(waiters):
+                time.sleep(0.001)
+        release.set()
+        for thread in [holder] + waiters:
+            thread.join(2)
+        self.assertEqual(order, ['heavy-1', 'light-1', 'heavy-2', 'heavy-3'])
+
+    def test_empty_bucket_and_full_slots_are_rejected(self):
+        scheduler = FairScheduler(max_concurrency=1, rate=1, burst=2)
+        with scheduler.slot('user', cost=2):
+            with self.assertRaises(SchedulerSaturated) as rate_limited:
+                with scheduler.slot('user'):
+                    pass
+            self.assertGreaterEqual(rate_limited.exception.retry_after, 1)
+            with self.assertRaises(SchedulerSaturated):
+                with scheduler.slot('other', max_wait=0.01):
+                    pass
+        stats = scheduler.snapshot()
+        self.assertEqual((stats['rate_limited'], stats['timed_out'], stats['active']), (1, 1, 0))
+
+    def test_zero_rate_reports_finite_retry_after(self):
+        scheduler = FairScheduler(rate=0, burst=1)
+        with scheduler.slot('user'):
+            pass
+        with self.assertRaises(SchedulerSaturated) as rate_limited:
+            with scheduler.slot('user'):
+                pass
+        self.assertEqual(rate_limited.exception.retry_after, MAX_RETRY_AFTER)
+
+    def test_rejected_requests_are_refunded_and_full_buckets_forgotten(self):
+        scheduler = FairScheduler(max_concurrency=1, rate=1, burst=2)
+        with scheduler.slot('holder', cost=0):
+            with self.assertRaises(SchedulerSaturated):
+                with scheduler.slot('user', cost=2, max_wait=0.01):
+                    pass
+        # The timed-out request did not spend the user's budget
+        with scheduler.slot('user', cost=2):
+            pass
+
+        with mock.patch('translation.scheduler.time.monotonic', return_value=time.monotonic() + 120):
+            with scheduler.slot('other'):
+                pass
+        self.assertEqual(set(scheduler._buckets), {'other'})
+
+class TranslationAdmissionTest(TestCase):
+    def test_saturated_scheduler_returns_429(self):
+        user = User.objects.create_user(username='busy', email='busy@example.com', password='testpassword')
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch.object(pipeline.OLLAMA_SCHEDULER, 'slot', side_effect=SchedulerSaturated('busy', 7)):
+            response = client.post('/api/translation/translate/', {'text': 'Bonjour mes amis, ça va?', 'model': 'local'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '7')
+
+class TranslationMemoryTest(SimpleTestCase):
+    def setUp(self):
+        self.memory = TranslationMemory()
+        self.memory.add('My name is Ravi.', 'MY NAME R-A-V-I')
+        self.memory.add('I have 3 brothers.', 'I BROTHER 3 HAVE')
+        self.memory.add('I like tea.', 'I TEA LIKE')
+
+    def test_exact_and_slot_matches(self):
+        self.assertEqual(self.memory.lookup('my name is ravi'), ('MY NAME R-A-V-I', 1.0))
+        self.assertEqual(self.memory.lookup('My name is Priya.')[0], 'MY NAME P-R-I-Y-A')
+        self.assertEqual(self.memory.lookup('I have 5 brothers.')[0], 'I BROTHER 5 HAVE')
+
+    def test_content_word_changes_are_not_reused(self):
+        self.assertIsNone(self.memory.lookup('I hate tea.'))
+        self.assertIsNone(self.memory.lookup('I have 3 sisters.'))
+
+    def test_capacity_evicts_oldest(self):
+        memory = TranslationMemory(capacity=2)
+        for sentence in ('I like tea.', 'I like milk.', 'I like rice.'):
+            memory.add(sentence, sentence.upper())
+        self.assertEqual(len(memory), 2)
+        self.assertIsNone(memory.lookup('I like tea.'))
+
+    def test_hits_are_kept_over_unused_entries(self):
+        memory = TranslationMemory(capacity=2)
+        memory.add('I like tea.', 'I TEA LIKE')
+        memory.add('I like milk.', 'I MILK LIKE')
+        self.assertIsNotNone(memory.lookup('I like tea.'))
+        memory.add('I like rice.', 'I RICE LIKE')
+        self.assertEqual(memory.lookup('I like tea.'), ('I TEA LIKE', 1.0))
+        self.assertIsNone(memory.lookup('I like milk.'))
+
+    def test_pipeline_reuses_llm_output(self):
+        with mock.patch.object(pipeline, 'TRANSLATION_MEMORY', TranslationMemory()), \
+                mock.patch('translation.pipeline.call_ollama_for_sentences', return_value=[('MY NAME R-A-V-I', 'ok')]) as ollama:
+            pipeline.translate_sentences(['My name is Ravi.'], 'local', options={'rules_first': False})
+            results = pipeline.translate_sentences(['My name is Priya.'], 'local', options={'rules_first': False})
+        self.assertEqual(ollama.call_count, 1)
+        self.assertEqual(results[0]['gloss'], 'MY NAME P-R-I-Y-A')
+        self.assertEqual(results[0]['backend'], 'memory')
+
+    def test_memory_off_is_not_written(self):
+        memory = TranslationMemory()
+        with mock.patch.object(pipeline, 'TRANSLATION_MEMORY', memory), \
+                mock.patch('translation.pipeline.call_ollama_for_sentences', return_value=[('MY NAME R-A-V-I', 'ok')]):
+            pipeline.translate_sentences(['My name is Ravi.'], 'local', options={'rules_first': False, 'memory': False})
+            with override_settings(TRANSLATION_MEMORY_ENABLED=False):
+                pipeline.translate_sentences(['My name is Ravi.'], 'local', options={'rules_first': False})
+        self.assertEqual(len(memory), 0)
+
+class SentenceSplitterTest(SimpleTestCase):
+    CORPUS = SPLITTER_CORPUS
+
+    def test_corpus(self):
+        for text, expected in self.CORPUS:
+            with self.subTest(text=text):
+                self.assertEqual(split_into_sentences(text), expected)
+
+    def test_splitter_benchmark_reports_timings(self):
+        report = run_splitter_benchmark(repeat=2, document_copies=5)
+        self.assertEqual(report['corpus']['sentences'], sum(len(expected) for _, expected in SPLITTER_CORPUS))
+        self.assertEqual(report['document']['sentences'], report['corpus']['sentences'] * 5)
+        self.assertEqual(report['document']['timing']['count'], 2)
+
+    def test_long_text(self):
+        # Paragraph breaks always split, so a long document splits exactly like its parts
+        text = '\n\n'.join(text for text, _ in self.CORPUS) * 100
+        expected = [sentence for _, sentences in self.CORPUS for sentence in sentences] * 100
+        self.assertEqual(split_into_sentences(text), expected)
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    """Answers generateContent like the Gemini REST API and records the key used."""
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        api_key = self.headers.get('x-goog-api-key')
+        self.server.seen_keys.append(api_key)
+        body = json.dumps({'candidates': [{
+            'content': {'role': 'model', 'parts': [{'text': f'GLOSS {api_key.upper()}'}]}, 'finishReason': 'STOP'
+        }]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class GeminiClientCacheTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), GeminiStubHandler)
+        cls.server.seen_keys = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.endpoint = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_concurrent_keys_do_not_mix(self):
+        cache = gemini_api.GeminiClientCache(endpoint=self.endpoint)
+        results = {}
+
+        def translate(key):
+            results[key] = [gemini_api.call_gemini_api(key, 'I like tea.', timeout=5) for _ in range(3)]
+
+        with mock.patch.object(gemini_api, 'GEMINI_CLIENTS', cache):
+            threads = [threading.Thread(target=translate, args=(key,)) for key in ('key-a', 'key-b')]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results, {'key-a': ['GLOSS KEY-A'] * 3, 'key-b': ['GLOSS KEY-B'] * 3})
+        self.assertEqual(len(cache), 2)
+
+    def test_clients_are_reused_and_evicted(self):
+        cache = gemini_api.GeminiClientCache(max_size=2, idle_seconds=60, endpoint=self.endpoint)
+        first = cache.get_client('key-a')
+        self.assertIs(cache.get_client('key-a'), first)
+        cache.get_client('key-b')
+        cache.get_client('key-c')
+        self.assertEqual(len(cache), 2)
+        self.assertIsNot(cache.get_client('key-a'), first)
+
+        with mock.patch('translation.gemini_api.time.monotonic', return_value=time.monotonic() + 120):
+            cache.get_client('key-d')
+        self.assertEqual(len(cache), 1)
+
+class TranslationBenchmarkTest(SimpleTestCase):
+    def test_benchmark_reports_levels_and_injected_errors(self):
+        original_url = ollama_api.OLLAMA_URL
+        with MockOllamaServer(latency='fixed:0.01', error_rate=0.5, seed=1) as server:
+            report = run_benchmark(server, [1, 2], requests_per_level=4)
+        self.assertEqual([level['concurrency'] for level in report['levels']], [1, 2])
+        for level in report['levels']:
+            self.assertEqual(level['status_codes'], {'200': 4})
+            self.assertEqual(sum(level['sentence_statuses'].values()), 4)
+            self.assertEqual(level['phases']['probe']['count'], 8)
+            self.assertEqual(level['phases']['generate']['count'], 4)
+            self.assertGreaterEqual(level['latency']['p99_ms'], level['latency']['p50_ms'])
+        self.assertGreater(server.counts['errors'], 0)
+        self.assertEqual(ollama_api.OLLAMA_URL, original_url)
+
+    def test_latency_specs(self):
+        self.assertEqual(parse_latency('fixed:0.2')(None), 0.2)
+        with self.assertRaises(ValueError):
+            parse_latency('gaussian:1')
+
+class TranslationHistoryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='historian', email='h@example.com', password='testpassword')
+        self.client.force_authenticate(self.user)
+
+    @override_settings(TRANSLATION_HISTORY_ENABLED=True)
+    def test_requests_are_buffered_then_listed(self):
+        buffer = history.HistoryBuffer(batch_size=10, autostart=False)
+        with mock.patch.object(history, 'HISTORY_BUFFER', buffer):
+            for text in ('The red car is fast.', 'I will go to school tomorrow.', 'Where do you live?'):
+                self.client.post('/api/translation/translate/', {'text': text, 'model': 'rules'}, format='json')
+            self.assertFalse(TranslationHistory.objects.exists())
+            self.assertEqual(buffer.flush(), 3)
+
+        response = self.client.get('/api/translation/history/', {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([row['text'] for row in response.data['results']], ['Where do you live?', 'I will go to school tomorrow.'])
+        self.assertEqual(response.data['results'][0]['backend'], 'rules')
+        self.assertEqual(response.data['results'][0]['status'], 'ok')
+
+class HistoryBufferTest(SimpleTestCase):
+    def test_background_flush_on_batch_size_and_bounded_backlog(self):
+        flushed = threading.Event()
+        with mock.patch.object(TranslationHistory.objects, 'bulk_create', side_effect=lambda rows, **kw: flushed.set()) as bulk_create:
+            buffer = history.HistoryBuffer(batch_size=2, flush_interval=60)
+            buffer.record(TranslationHistory(text='a'))
+            buffer.record(TranslationHistory(text='b'))
+            self.assertTrue(flushed.wait(5))
+        self.assertEqual([row.text for row in bulk_create.call_args.args[0]], ['a', 'b'])
+
+        buffer = history.HistoryBuffer(max_pending=2, autostart=False)
+        for text in 'abc':
+            buffer.record(TranslationHistory(text=text))
+        self.assertEqual(buffer.snapshot()['dropped'], 1)
+        self.assertEqual(buffer.snapshot()['pending'], 2)
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        def bulk_create(rows, **kwargs):
+            if len(rows) > 1 or rows[0].text == 'bad':
+                raise ValueError('insert failed')
+        buffer = history.HistoryBuffer(autostart=False)
+        for text in ('a', 'bad', 'b'):
+            buffer.record(TranslationHistory(text=text))
+        with mock.patch.object(TranslationHistory.objects, 'bulk_create', side_effect=bulk_create), \
+                self.assertLogs(level='WARNING'):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual((buffer.snapshot()['flushed'], buffer.snapshot()['failed']), (2, 1))
+
+    @override_settings(TRANSLATION_HISTORY_ENABLED=True)
+    def test_unsaved_users_are_not_recorded(self):
+        buffer = history.HistoryBuffer(autostart=False)
+        with mock.patch.object(history, 'HISTORY_BUFFER', buffer):
+            history.record_translation(User(id=1, username='bench-1'), 'Hello.', 'local', [], 0.1)
+        self.assertEqual(buffer.snapshot()['recorded'], 0)
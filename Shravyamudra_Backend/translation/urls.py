@@ -1,8 +1,15 @@
 from django.urls import path
-from .views import GeminiAPIKeyView, TranslationAPIView
+from .views import (
+    GeminiAPIKeyView, TranslationAPIView, TranslationHistoryListView, TranslationJobDetailView,
+    TranslationJobListCreateView, TranslationStatsView
+)
 
 urlpatterns = [
     path('keys/gemini/', GeminiAPIKeyView.as_view(), name='gemini-api-key'),
     path('translate/', TranslationAPIView.as_view(), name='translation'),
     path('convert/', TranslationAPIView.as_view(), name='translation-convert'),
+    path('jobs/', TranslationJobListCreateView.as_view(), name='translation-job-list'),
+    path('jobs/<int:job_id>/', TranslationJobDetailView.as_view(), name='translation-job-detail'),
+    path('history/', TranslationHistoryListView.as_view(), name='translation-history'),
+    path('stats/', TranslationStatsView.as_view(), name='translation-stats'),
 ]
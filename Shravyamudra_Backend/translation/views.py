@@ -2,15 +2,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from .models import UserAPIKey
-from .serializers import UserAPIKeySerializer, UserAPIKeySetSerializer
+from .models import TranslationHistory, TranslationJob, UserAPIKey
+from .serializers import (
+    TranslationHistorySerializer, TranslationJobSentenceSerializer, TranslationJobSerializer, UserAPIKeySerializer,
+    UserAPIKeySetSerializer
+)
+from rest_framework import generics
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
 import logging
-from .gemini_api import call_gemini_api
-from .ollama_api import call_ollama_api
+import time
+from django.conf import settings
+from .history import HISTORY_BUFFER, record_translation
+from .jobs import submit_job
+from .pipeline import MODELS, OLLAMA_GEMINI_HEDGER, OLLAMA_SCHEDULER, get_hedge_caller, translate_sentences
+from .scheduler import SchedulerSaturated
+from .sentences import split_into_sentences
 
 class GeminiAPIKeyView(APIView):
     permission_classes = [IsAuthenticated]
@@ -44,6 +54,19 @@ class GeminiAPIKeyView(APIView):
 class TranslationAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    def _get_deadline(self, options):
+        """
+        Returns the time.monotonic() deadline for this request: the client's
+        options.deadline_ms, capped at TRANSLATION_MAX_DEADLINE_SECONDS.
+        """
+        budget = settings.TRANSLATION_MAX_DEADLINE_SECONDS
+        if options.get('deadline_ms') is not None:
+            requested = float(options['deadline_ms']) / 1000
+            if requested <= 0:
+                raise ValueError('deadline_ms must be positive')
+            budget = min(budget, requested)
+        return time.monotonic() + budget
+
     def post(self, request):
         data = request.data
         text = data.get('text', '').strip()
@@ -53,40 +76,128 @@ class TranslationAPIView(APIView):
 
         if not text:
             return Response({'success': False, 'error': 'No text provided.'}, status=400)
+        if model not in MODELS:
+            return Response({'success': False, 'error': f'Invalid model: {model}'}, status=400)
+        try:
+            deadline = self._get_deadline(options)
+        except (TypeError, ValueError):
+            return Response({'success': False, 'error': 'Invalid deadline_ms.'}, status=400)
+        start = time.monotonic()
 
         try:
-            if model == 'gemini-pro':
+            if model == 'gemini-pro' and not api_key:
                 # Use provided api_key, else fetch from user
-                if not api_key:
-                    try:
-                        user_api_key = UserAPIKey.objects.get(user=request.user)
-                        api_key = user_api_key.gemini_api_key
-                    except UserAPIKey.DoesNotExist:
-                        return Response({'success': False, 'error': 'No Gemini API key found for user.'}, status=403)
-                converted = call_gemini_api(api_key, text)
-            elif model == 'local':
-                # Use Ollama for local model
-                ollama_model = options.get('ollama_model', 'mistral')
                 try:
-                    converted = call_ollama_api(text, model_name=ollama_model)
-                except Exception as e:
-                    if "Could not connect to Ollama" in str(e):
-                        return Response({
-                            'success': False,
-                            'error': 'Local LLM service is not running. Please start Ollama or try using Gemini Pro.'
-                        }, status=503)
-                    raise e
-            else:
-                return Response({'success': False, 'error': f'Invalid model: {model}'}, status=400)
+                    user_api_key = UserAPIKey.objects.get(user=request.user)
+                    api_key = user_api_key.gemini_api_key
+                except UserAPIKey.DoesNotExist:
+                    return Response({'success': False, 'error': 'No Gemini API key found for user.'}, status=403)
 
-            return Response({'success': True, 'convertedText': converted})
+            try:
+                sentences = translate_sentences(
+                    split_into_sentences(text), model, api_key=api_key, options=options, deadline=deadline,
+                    sentence_caller=get_hedge_caller(request.user, options) if model == 'local' else None,
+                    user_key=request.user.id
+                )
+            except SchedulerSaturated as e:
+                return Response(
+                    {'success': False, 'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': str(e.retry_after)}
+                )
+            except Exception as e:
+                if model == 'local' and "Could not connect to Ollama" in str(e):
+                    record_translation(request.user, text, model, [], time.monotonic() - start, error=True)
+                    return Response({
+                        'success': False,
+                        'error': 'Local LLM service is not running. Please start Ollama or try using Gemini Pro.'
+                    }, status=503)
+                raise e
+
+            converted = '\n'.join(s['gloss'] for s in sentences)
+            record_translation(request.user, text, model, sentences, time.monotonic() - start)
+            return Response({
+                'success': True,
+                'convertedText': converted,
+                'partial': any(s['status'] != 'ok' for s in sentences),
+                'sentences': sentences,
+            })
             
         except Exception as e:
             logging.exception("Translation failed")
+            record_translation(request.user, text, model, [], time.monotonic() - start, error=True)
             error_msg = str(e)
             if model == 'local':
                 error_msg = f"Local LLM translation failed: {error_msg}"
+            elif model == 'rules':
+                error_msg = f"Rule-based translation failed: {error_msg}"
             else:
                 error_msg = f"Gemini API translation failed: {error_msg}"
             return Response({'success': False, 'error': error_msg}, status=500)
 
+class TranslationJobListCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        jobs = TranslationJob.objects.filter(user=request.user)[:20]
+        return Response(TranslationJobSerializer(jobs, many=True).data)
+
+    def post(self, request):
+        data = request.data
+        text = data.get('text', '').strip()
+        model = data.get('model', 'local')
+        api_key = data.get('apiKey')
+        options = data.get('options', {})
+
+        if not text:
+            return Response({'success': False, 'error': 'No text provided.'}, status=400)
+        if model not in MODELS:
+            return Response({'success': False, 'error': f'Invalid model: {model}'}, status=400)
+        if model == 'gemini-pro' and not api_key and not UserAPIKey.objects.filter(user=request.user).exclude(gemini_api_key='').exists():
+            return Response({'success': False, 'error': 'No Gemini API key found for user.'}, status=403)
+
+        job = submit_job(request.user, text, model, options=options, api_key=api_key)
+        return Response({'success': True, 'jobId': job.id, **TranslationJobSerializer(job).data}, status=status.HTTP_202_ACCEPTED)
+
+class TranslationJobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = TranslationJob.objects.filter(id=job_id, user=request.user).first()
+        if not job:
+            return Response({'detail': 'Job not found.'}, status=status.HTTP_404_NOT_FOUND)
+        # Pollers pass ?since=<index> to fetch only sentences they have not seen yet
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            return Response({'detail': 'Invalid since value.'}, status=status.HTTP_400_BAD_REQUEST)
+        finished = job.sentences.filter(index__gte=since).exclude(status='pending')
+        sentences = TranslationJobSentenceSerializer(finished, many=True).data
+        return Response({
+            **TranslationJobSerializer(job).data,
+            'sentences': sentences,
+            'convertedText': '\n'.join(s['gloss'] for s in sentences),
+        })
+
+class TranslationStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'hedging': OLLAMA_GEMINI_HEDGER.snapshot(),
+            'scheduler': OLLAMA_SCHEDULER.snapshot(),
+            'history': HISTORY_BUFFER.snapshot(),
+        })
+
+class TranslationHistoryPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class TranslationHistoryListView(generics.ListAPIView):
+    """The user's past translations, newest first (served by the (user, created_at) index)."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = TranslationHistorySerializer
+    pagination_class = TranslationHistoryPagination
+
+    def get_queryset(self):
+        return TranslationHistory.objects.filter(user=self.request.user).order_by('-created_at', '-id')